@@ -61,9 +61,7 @@ class ActivityAgent(Agent):
         if context.get("preferences"):
             user_msg += f"Preferences: {context['preferences']}."
 
-        data = await self.llm.complete_json(FALLBACK_PROMPT, user_msg)
-        items = data if isinstance(data, list) else data.get("activities", [])
-        return [Activity(**a) for a in items]
+        return await self.llm.complete_structured(FALLBACK_PROMPT, user_msg, Activity, many=True)
 
     @staticmethod
     def _trip_duration(context: dict) -> int:
@@ -0,0 +1,71 @@
+from backend.config import settings
+from backend.llm.base import LLMProvider, Messages, estimate_tokens
+
+SUMMARY_SYSTEM_PROMPT = """\
+You keep a running summary of a trip-planning chat between a traveler and a planning assistant.
+Merge the existing summary (if any) with the new turns into one updated summary.
+
+Keep every trip detail the traveler has given: origin, destination(s) and cities, dates or
+timeframe, number of travelers, budget, interests, pace, anything they ruled out, and pre-booked
+flights or hotels with all their specifics. Also note which questions the assistant already asked.
+
+Write short bullet points, at most 250 words. Return only the summary."""
+
+
+class ConversationWindow:
+    """The planner chat as native provider messages, with a rolling summary.
+
+    Turns are sent as real user/assistant messages, so each request extends
+    the previous one and providers serve the shared prefix from their prompt
+    cache. Once the history passes `summary_tokens`, all but the last
+    `keep_turns` turns are folded into a summary; the prefix then stays
+    stable until the next fold.
+    """
+
+    def __init__(self, summary_tokens: int | None = None, keep_turns: int | None = None):
+        self.summary_tokens = summary_tokens or settings.llm_conversation_summary_tokens
+        self.keep_turns = keep_turns or settings.llm_conversation_keep_turns
+        self.summary = ""
+        self._folded: Messages = []  # Turns already covered by the summary
+
+    async def messages(self, llm: LLMProvider, conversation: Messages, preamble: str = "") -> Messages:
+        """Build the messages for one request, folding old turns first if needed.
+
+        `preamble` (e.g. today's date) is prepended to the first user turn.
+        """
+        if conversation[:len(self._folded)] != self._folded:
+            self.summary, self._folded = "", []  # A different conversation
+
+        recent = conversation[len(self._folded):]
+        if estimate_tokens(self.summary, recent) > self.summary_tokens:
+            await self._fold(llm, conversation)
+            recent = conversation[len(self._folded):]
+
+        head = preamble
+        if self.summary:
+            head += f"Summary of our conversation so far:\n{self.summary}\n\n"
+        messages = [dict(m) for m in recent]
+        if messages and messages[0]["role"] == "user":
+            messages[0]["content"] = head + messages[0]["content"]
+        elif head:
+            messages.insert(0, {"role": "user", "content": head.strip()})
+        return messages
+
+    async def _fold(self, llm: LLMProvider, conversation: Messages):
+        """Summarize everything but the most recent turns into self.summary."""
+        start = len(self._folded)
+        end = len(conversation) - self.keep_turns
+        # The kept turns must open with a user message
+        while end > start and conversation[end]["role"] != "user":
+            end -= 1
+        if end <= start:
+            return
+
+        new_turns = "\n".join(
+            f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}"
+            for m in conversation[start:end]
+        )
+        user_msg = f"Existing summary:\n{self.summary or '(none)'}\n\nNew turns:\n{new_turns}"
+        resp = await llm.complete(SUMMARY_SYSTEM_PROMPT, user_msg, temperature=0.2, max_tokens=1024)
+        self.summary = resp.content.strip()
+        self._folded = conversation[:end]
@@ -78,13 +78,11 @@ class DestinationAgent(Agent):
             f"Keep the existing fields but fix them if they seem wrong."
         )
 
-        data = await self.llm.complete_json(ENRICH_PROMPT, user_msg)
-        return DestinationInfo(**data)
+        return await self.llm.complete_structured(ENRICH_PROMPT, user_msg, DestinationInfo)
 
     async def _fetch_llm(self, context: dict) -> DestinationInfo:
         user_msg = (
             f"Destination info for {context['destination']}. "
             f"Traveler is coming from {context['origin']}."
         )
-        data = await self.llm.complete_json(FULL_PROMPT, user_msg)
-        return DestinationInfo(**data)
+        return await self.llm.complete_structured(FULL_PROMPT, user_msg, DestinationInfo)
@@ -113,10 +113,12 @@ class FlightAgent(Agent):
         elif context.get("budget_usd"):
             user_msg += f" Total trip budget: ${context['budget_usd']}."
 
-        data = await self.llm.complete_json(FALLBACK_PROMPT, user_msg)
-        options = data if isinstance(data, list) else data.get("flights", [])
-        travelers = context.get("travelers", 1)
-        return [FlightOption(**f, travelers=travelers) for f in options]
+        options = await self.llm.complete_structured(
+            FALLBACK_PROMPT, user_msg, FlightOption, many=True
+        )
+        for option in options:
+            option.travelers = context.get("travelers", 1)
+        return options
 
     @staticmethod
     def _get_flight_budget(context: dict) -> float | None:
@@ -81,8 +81,11 @@ class HotelAgent(Agent):
         budget = self._get_hotel_budget(context)
         priority = self._get_priority_notes(context)
 
+        place = context["destination"]
+        if context.get("country") and context["country"] not in place:
+            place += f", {context['country']}"
         user_msg = (
-            f"Find lodging in {context['destination']} "
+            f"Find lodging in {place} "
             f"for {nights or 'several'} nights. "
             f"Travelers: {context.get('travelers', 1)}."
         )
@@ -100,9 +103,7 @@ class HotelAgent(Agent):
         if context.get("interests"):
             user_msg += f" Interests: {', '.join(context['interests'])}."
 
-        data = await self.llm.complete_json(FALLBACK_PROMPT, user_msg)
-        options = data if isinstance(data, list) else data.get("hotels", [])
-        return [HotelOption(**h) for h in options]
+        return await self.llm.complete_structured(FALLBACK_PROMPT, user_msg, HotelOption, many=True)
 
     @staticmethod
     def _calc_nights(context: dict) -> int:
@@ -0,0 +1,183 @@
+import json
+import math
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+from backend.config import settings
+
+MODES = ("direct", "suggest")
+
+# Phrases that clearly ask for options
+SUGGEST_PATTERNS = [
+    "what else", "alternatives", "options", "suggest", "not sure",
+    "don't want to do", "don't like", "not feeling", "what are my",
+    "other ideas", "something else", "any other", "recommendations",
+]
+_SUGGEST_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(p) for p in SUGGEST_PATTERNS) + r")", re.IGNORECASE
+)
+# Imperatives that name the change, e.g. "Add a sushi dinner on Day 2"
+_DIRECT_RE = re.compile(
+    r"^(?:please\s+|can you\s+|could you\s+)?"
+    r"(?:add|move|make|put|swap|switch|shift|schedule|book|drop|remove|cancel|shorten"
+    r"|extend|change\s+.+\s+to|replace\s+.+\s+with)\b",
+    re.IGNORECASE,
+)
+# An imperative that asks a question or leaves the target open ("Swap the
+# museum for something outdoorsy") still wants options; the model decides
+_OPEN_ENDED_RE = re.compile(
+    r"\?|\b(?:something|anything|somewhere|ideas?|recommend\w*|suggestions?|choices)\b",
+    re.IGNORECASE,
+)
+
+# The classifier prompt's examples plus typical requests, so the model works
+# before any decisions have been logged
+SEED_EXAMPLES: list[tuple[str, str]] = [
+    ("Move the temple visit to the morning", "direct"),
+    ("Add a sushi dinner on Day 2", "direct"),
+    ("Make Day 5 more relaxed", "direct"),
+    ("Replace the museum with a cooking class", "direct"),
+    ("I want cheaper restaurants", "direct"),
+    ("I want mornings free for sleeping in", "direct"),
+    ("Less walking on the last day please", "direct"),
+    ("Day 3 should end earlier, we have an early flight", "direct"),
+    ("Include a visit to the Louvre", "direct"),
+    ("Let's do the boat tour on Day 4 instead of Day 2", "direct"),
+    ("We'd rather have dinner at a rooftop bar on the first night", "direct"),
+    ("Skip the nightlife, we have kids with us", "direct"),
+    ("I don't want to do the walking tour on Day 3", "suggest"),
+    ("What else could I do Day 2 afternoon?", "suggest"),
+    ("Suggest alternatives for the museum visit", "suggest"),
+    ("I'm not feeling the Day 4 plan, what are my options?", "suggest"),
+    ("Replace the hiking, not sure with what", "suggest"),
+    ("Is there anything better than the market tour?", "suggest"),
+    ("Could we do something different on Day 1 evening?", "suggest"),
+    ("The cooking class sounds boring", "suggest"),
+    ("Any ideas for a rainy afternoon?", "suggest"),
+    ("Day 6 looks a bit dull, what would you recommend?", "suggest"),
+    ("Give me a few choices for the last evening", "suggest"),
+    ("Hmm, the river cruise isn't really my thing", "suggest"),
+]
+
+
+@dataclass
+class IntentPrediction:
+    mode: str  # "direct" or "suggest"
+    confidence: float  # 0.5 (a coin flip) to 1.0
+    source: str  # "pattern" or "model"
+
+
+def _features(text: str) -> list[str]:
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if words:
+        features.append(f"^{words[0]}")
+    if "?" in text:
+        features.append("<question>")
+    return features
+
+
+def _label(mode: str) -> float:
+    return 1.0 if mode == "suggest" else 0.0
+
+
+class IntentClassifier:
+    """Tells direct edits from requests for suggestions without an LLM call.
+
+    Clear phrasings are caught by compiled patterns. Everything else goes
+    to a logistic regression over word unigrams and bigrams, trained on
+    SEED_EXAMPLES plus the latest `max_logged` decisions recorded (by the
+    LLM classifier) in `log_path`, and retrained as new decisions are
+    recorded. Unreadable log lines, e.g. from an interrupted write, are
+    skipped.
+
+    Training on every example happens once, on first use; each decision
+    recorded afterwards updates the weights with one more step.
+    """
+
+    def __init__(self, log_path: str | Path | None = None, max_logged: int | None = None):
+        self.log_path = Path(log_path or settings.intent_log_path)
+        self.weights: dict[str, float] = {}
+        self.bias = 0.0
+        # Bounded, as the first training takes longer the more there are
+        self._logged: deque[tuple[str, str]] = deque(
+            maxlen=settings.intent_max_logged_examples if max_logged is None else max_logged
+        )
+        self._stale = True
+        self._lock = threading.Lock()
+        if self.log_path.exists():
+            for line in self.log_path.read_text(errors="replace").splitlines():
+                try:
+                    entry = json.loads(line)
+                    text, mode = entry["text"], entry["mode"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                if isinstance(text, str) and mode in MODES:
+                    self._logged.append((text, mode))
+
+    @property
+    def _examples(self) -> list[tuple[str, str]]:
+        return SEED_EXAMPLES + list(self._logged)
+
+    def _train(self, epochs: int = 60):
+        weights: dict[str, float] = {}
+        bias = 0.0
+        data = [(_features(text), _label(mode)) for text, mode in self._examples]
+        for _ in range(epochs):
+            for features, label in data:
+                bias = self._step(weights, bias, features, label)
+        self.weights, self.bias, self._stale = weights, bias, False
+
+    @classmethod
+    def _step(
+        cls, weights: dict[str, float], bias: float, features: list[str], label: float,
+        rate: float = 0.5, l2: float = 1e-3,
+    ) -> float:
+        """One SGD step on a single example; updates `weights` and returns the new bias."""
+        error = cls._sigmoid(bias + sum(weights.get(f, 0.0) for f in features)) - label
+        for f in features:
+            w = weights.get(f, 0.0)
+            weights[f] = w - rate * (error + l2 * w)
+        return bias - rate * error
+
+    @staticmethod
+    def _sigmoid(z: float) -> float:
+        return 1.0 / (1.0 + math.exp(-max(min(z, 30.0), -30.0)))
+
+    def classify(self, text: str) -> IntentPrediction:
+        if _SUGGEST_RE.search(text):
+            return IntentPrediction("suggest", 1.0, "pattern")
+        if _DIRECT_RE.search(text.strip()) and not _OPEN_ENDED_RE.search(text):
+            return IntentPrediction("direct", 0.95, "pattern")
+        with self._lock:
+            if self._stale:
+                self._train()
+            p = self._sigmoid(self.bias + sum(self.weights.get(f, 0.0) for f in _features(text)))
+        mode = "suggest" if p >= 0.5 else "direct"
+        return IntentPrediction(mode, round(max(p, 1 - p), 3), "model")
+
+    def record(self, text: str, mode: str):
+        """Learn from a decision made elsewhere (e.g. the LLM) and log it for next time."""
+        if mode not in MODES:
+            return
+        with self._lock:
+            self._logged.append((text, mode))
+            if not self._stale:
+                self.bias = self._step(self.weights, self.bias, _features(text), _label(mode))
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.log_path.open("a") as f:
+                f.write(json.dumps({"text": text, "mode": mode}) + "\n")
+
+
+_classifier: IntentClassifier | None = None
+
+
+def get_intent_classifier() -> IntentClassifier:
+    """Return the process-wide classifier, loading its decision log on first use."""
+    global _classifier
+    if _classifier is None:
+        _classifier = IntentClassifier()
+    return _classifier
@@ -1,19 +1,55 @@
 import asyncio
-import json
-from datetime import date, datetime
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from datetime import date, datetime, timedelta
 from typing import Any, Callable
 
+from pydantic import ValidationError
+
 from backend.agents.activity_agent import ActivityAgent
+from backend.agents.conversation import ConversationWindow
 from backend.agents.destination_agent import DestinationAgent
 from backend.agents.flight_agent import FlightAgent
+from backend.agents.intent import get_intent_classifier
 from backend.agents.hotel_agent import HotelAgent
+from backend.agents.pipeline import Stage, StageGraph
+from backend.agents.prefetch import MISS, Prefetcher, input_key
+from backend.agents.refinement import (
+    PatchError,
+    SuggestionPool,
+    SuggestionsExhaustedError,
+    apply_patch,
+    is_structural,
+    local_refinement,
+)
 from backend.agents.weather_agent import WeatherAgent
-from backend.llm.router import get_provider
+from backend.config import settings
+from backend.llm.base import TruncatedResponseError
+from backend.llm.compact import check_context, to_prompt_json, top_k
+from backend.llm.json_stream import (
+    JSONArrayStream,
+    JSONStringFieldStream,
+    parse_json_text,
+    salvage_json,
+)
+from backend.llm.router import get_provider, model_tier
+from backend.llm.schema import json_schema_for, validate_items
+from backend.llm.usage import CallRecord, UsageReport, capture_calls, usage_scope
+from backend.models.activities import Activity
 from backend.models.destination import DestinationInfo
-from backend.models.itinerary import DayPlan, Itinerary
+from backend.models.itinerary import (
+    DayOutline,
+    DayPlan,
+    Itinerary,
+    ItineraryDraft,
+    ItineraryOverview,
+    ItineraryPatch,
+    ItinerarySkeleton,
+)
 from backend.models.flights import FlightLeg, FlightOption
 from backend.models.hotels import CityHotels, HotelOption
 from backend.models.trip import CityStay, PreBookedFlight, PreBookedHotel, TripRequest
+from backend.models.weather import DayWeather
 
 GATHER_SYSTEM_PROMPT = """\
 You are a friendly, knowledgeable travel planning assistant having a natural conversation to learn about someone's trip.
@@ -247,6 +283,77 @@ Return a JSON object matching this structure:
   "practical_tips": ["Tip 1", "Tip 2"]
 }"""
 
+SKELETON_SYSTEM_PROMPT = """\
+You are an expert travel planner outlining a long trip before each day is written in detail.
+You will receive the trip request, the trip's dates, flight options, suggested activities,
+the weather forecast and destination info.
+
+Return a skeleton with one entry per date, in order:
+- city: where the traveler spends that day (for day trips, the day-trip destination)
+- title: a short theme for the day, e.g. "Temples and Traditional Tokyo"
+- activities: names of suggested activities for that day, copied exactly from the list
+- notes: anything the day's writer must plan around — arrival or departure (with flight times
+  from the mid-range, 3rd, flight option), checking out and traveling to the next city, a day trip
+
+Plan it as a whole:
+- Use each suggested activity at most once, and spread the user's interests across the trip
+- Group activities that are close together on the same day
+- Put outdoor activities on days with good weather where the forecast allows
+- Keep arrival, departure and travel days light
+- For multi-city trips, follow the city_stays dates exactly
+
+Return a JSON object: {"title": "...", "date_range": "...", "days": [...]}"""
+
+DAY_SYSTEM_PROMPT = """\
+You are an expert travel planner writing one day of a longer itinerary in detail.
+You will receive the trip basics, the outline of the whole trip, this day's outline entry,
+and the details, weather and hotel options that apply to this day.
+
+Write this day only:
+- Plan morning, afternoon and evening around the day's outlined activities and notes
+- Add meals and neighborhood suggestions that fit the day's area and the traveler's budget
+  priorities; don't repeat anything the outline already places on other days
+- Use the day's outlined title, number and date
+- estimated_cost_usd: activities and entry fees for the day, for all travelers
+- If the trip spans several cities, say which city's hotel the traveler is staying at
+
+WEATHER: Entries with source "api" are real-time forecasts — plan confidently around them.
+If no forecast is given, set weather to "Forecast unavailable — plan assumes clear weather".
+Always plan the primary activities for clear weather, set alt_weather_note to "If it rains:"
+and give indoor/covered alternatives in alt_morning, alt_afternoon, alt_evening, in the same
+area when possible.
+
+Return a JSON object for the day: {"number", "date", "title", "weather", "morning",
+"afternoon", "evening", "estimated_cost_usd", "alt_weather_note", "alt_morning",
+"alt_afternoon", "alt_evening"}"""
+
+OVERVIEW_SYSTEM_PROMPT = """\
+You are an expert travel planner finishing an itinerary whose days are already written.
+You will receive the trip request, flight and hotel options, destination info, and a summary
+of every planned day with its estimated cost.
+
+Return a JSON object:
+{
+  "destination_summary": "Markdown overview of the destination...",
+  "budget_breakdown": {"flights": 800, "hotels": 600, "activities": 400, "food": 500,
+                       "transportation": 200, "miscellaneous": 100},
+  "practical_tips": ["Tip 1", "Tip 2"]
+}
+
+Budget breakdown, from ACTUAL PRICES in the data:
+- Flights: the mid-range (3rd) option's total_price_usd
+- Hotels: the mid-range (3rd) option's total_price_usd; for multi-city trips, sum it over every
+  city in hotels_by_city
+- Activities: the sum of the days' estimated_cost_usd
+- Food: estimate from the destination, number of days and travelers
+- If prebooked_flights or prebooked_hotels is true, those options are confirmed bookings; use
+  their cost as given
+- Respect the user's total budget and category allocations and their priority_notes
+
+Practical tips should be specific to this trip and its days. If the destination is in Europe or
+rail-friendly Asia, include rail alternatives with routes, journey times, costs and relevant passes,
+and for multi-city trips compare rail vs. flying between the cities."""
+
 REFINE_SYSTEM_PROMPT = """\
 You are an expert travel planner refining an existing itinerary based on user feedback.
 You will receive the current itinerary as JSON and a user modification request.
@@ -273,11 +380,51 @@ RULES:
 - Preserve alt weather plans (alt_morning, alt_afternoon, alt_evening, alt_weather_note) unless the user specifically asks to change them.
 - If you change a primary activity, update the corresponding alt field to remain a sensible alternative."""
 
+REFINE_PATCH_SYSTEM_PROMPT = """\
+You are an expert travel planner refining an existing itinerary based on user feedback.
+You will receive the current itinerary as JSON and a user modification request.
+
+Return ONLY what changes, as a patch:
+{
+  "days": [
+    {"number": 5, "morning": "New morning plan...", "estimated_cost_usd": 60}
+  ],
+  "budget_deltas": {"activities": -40},
+  "tips_added": ["New tip"],
+  "tips_removed": ["Exact text of a tip to drop"],
+  "rewrite": false
+}
+- days: one entry per changed day, identified by its number, with ONLY the fields that change
+  (title, weather, morning, afternoon, evening, estimated_cost_usd, alt_weather_note, alt_morning,
+  alt_afternoon, alt_evening). Give each changed field's complete new text. Omit unchanged days.
+- budget_deltas: amounts to add to (or, negative, subtract from) existing budget_breakdown
+  categories, keyed exactly as they appear there, whenever costs change meaningfully. Omit if
+  the budget is unaffected.
+- tips_added / tips_removed: practical tips to add, and existing tips to drop, copied exactly.
+- rewrite: set to true, with nothing else, only if the request can't be expressed this way —
+  e.g. adding or removing days or changing the trip's dates.
+
+How to handle requests:
+- Move activities: remove from the current slot, place in the target, shift displaced activities logically
+- Swap activities: substitute the activity, update its day's cost
+- Remove activities: fill the gap with a suitable alternative that fits the day's theme/location
+- Add activities: find a slot, adjust the day's schedule
+- Tone adjustments ("make Day 5 more relaxed"): reduce activity density, add free time
+- Budget changes ("cheaper restaurants"): adjust food choices on every affected day
+- Reorder days ("swap Day 2 and Day 4"): exchange the plans between the two day numbers; dates stay with the numbers
+- Time slot changes ("mornings free"): shift morning activities to later, plan light mornings
+
+Rules:
+- Only change what the user asked for.
+- Never leave a time slot empty; account for geographic proximity when shifting activities.
+- Update estimated_cost_usd for any day whose activities changed.
+- If you change a primary activity, update the corresponding alt field to remain a sensible alternative."""
+
 SUGGEST_SYSTEM_PROMPT = """\
 You are an expert travel planner. The user wants alternatives for part of their itinerary.
 You will receive the current itinerary as JSON and the user's request.
 
-Analyze what the user wants to change and suggest exactly 3 alternatives.
+Analyze what the user wants to change and suggest as many alternatives as asked for (3 if not stated).
 
 Return a JSON object:
 {
@@ -333,126 +480,307 @@ Return JSON: {"mode": "direct"} or {"mode": "suggest"}
 - "Replace the hiking, not sure with what"
 """
 
-# Keyword patterns that clearly indicate suggestion mode (skip LLM classification)
-_SUGGEST_PATTERNS = [
-    "what else", "alternatives", "options", "suggest", "not sure what",
-    "don't want to do", "don't like", "not feeling", "what are my",
-    "other ideas", "something else", "any other", "recommendations",
-]
+# Suggested alternatives shown at a time (the CLI offers 1/2/3)
+_SUGGESTION_PAGE_SIZE = 3
+
+# Hotels waits at most this long (after parsing) for Destination's country
+_DESTINATION_WAIT_S = 3.0
+
+# Speculative research starts once the planner has collected all of these
+_PREFETCH_AFTER = ("destination", "origin", "dates", "travelers")
+# Request fields each prefetched agent reads; its result is only used if
+# they are unchanged in the final TripRequest
+_PREFETCH_FIELDS: dict[str, tuple[str, ...]] = {
+    "destination": ("destination", "origin"),
+    "weather": ("destination", "departure_date", "return_date", "city_stays"),
+    "activities": (
+        "destination", "departure_date", "return_date", "interests", "preferences",
+        "budget_allocation.activities_max_usd", "budget_allocation.priority_notes",
+    ),
+    "flights": (
+        "origin", "origin_code", "destination", "destination_code", "departure_date",
+        "return_date", "trip_type", "travelers", "preferred_airlines", "budget_usd",
+        "budget_allocation.flights_max_usd",
+    ),
+}
 
 # Type for progress callbacks
 ProgressCallback = Callable[[str, str], None]  # (agent_name, status)
+# Called with each DayPlan as soon as the writer finishes generating it
+DayCallback = Callable[[DayPlan], None]
 
 
 class Orchestrator:
     def __init__(self, on_progress: ProgressCallback | None = None):
         self._on_progress = on_progress or (lambda *_: None)
+        # Tokens, latency and cost of every LLM call this orchestrator makes
+        self.usage = UsageReport()
+        self.conversation = ConversationWindow()
+        self.last_plan_graph: StageGraph | None = None
+        # Research started during gather_details, keyed by its inputs
+        self.prefetch = Prefetcher()
+        self._speculation: asyncio.Task | None = None
+        self._speculated_on: dict | None = None
+        # Alternatives for the current suggestion request, and its refill
+        self._suggestion_pool: SuggestionPool | None = None
+        self._pool_refill: asyncio.Task | None = None
+        # Calls made precomputing picks for the current suggestion request,
+        # across its pages, and the jobs that got past the budget check
+        self._precompute_spent: list[list[CallRecord]] = []
+        self._precompute_started: set[str] = set()
 
     def _report(self, agent: str, status: str):
         self._on_progress(agent, status)
 
+    def _usage_scope(self, phase: str, task_type: str, agent: str = ""):
+        """Attribute LLM calls in the block to a pipeline phase in self.usage."""
+        return usage_scope(self.usage, phase=phase, task_type=task_type, agent=agent)
+
+    @staticmethod
+    def _date_preamble() -> str:
+        return f"Today's date: {date.today().isoformat()}\n\n"
+
     async def gather_details(
-        self, conversation: list[dict[str, str]]
+        self,
+        conversation: list[dict[str, str]],
+        on_message: Callable[[str], None] | None = None,
     ) -> dict:
         """Analyze conversation and return either questions or readiness signal.
 
         Args:
             conversation: List of {"role": "user"/"assistant", "content": "..."} dicts.
+            on_message: If given, the response is streamed and this is called with
+                each new piece of the "message" text as soon as it is generated.
 
         Returns:
             {"ready": bool, "message": str, "collected": dict}
         """
-        planning_llm = get_provider("planning")
-        today = date.today().isoformat()
+        gather_llm = get_provider("gather")
+
+        with self._usage_scope("gather", "gather", "Planner"):
+            messages = await self.conversation.messages(
+                gather_llm, conversation, self._date_preamble()
+            )
+            if on_message is None:
+                result = await gather_llm.complete_json(GATHER_SYSTEM_PROMPT, messages)
+            else:
+                message_stream = JSONStringFieldStream("message")
+                chunks = []
+                async for chunk in gather_llm.stream_json(GATHER_SYSTEM_PROMPT, messages):
+                    chunks.append(chunk)
+                    delta = message_stream.feed(chunk)
+                    if delta:
+                        on_message(delta)
+                result = parse_json_text("".join(chunks))
+        self._maybe_prefetch(conversation, result)
+        return result
+
+    def _maybe_prefetch(self, conversation: list[dict[str, str]], result: dict):
+        """Speculatively start research once the chat has the core trip details.
+
+        Runs again whenever the collected details change; jobs whose inputs
+        are unchanged keep running and stale ones are cancelled. Not done
+        once the planner is ready, since plan_trip follows right away.
+        """
+        collected = result.get("collected") or {}
+        if not settings.research_prefetch or result.get("ready"):
+            return
+        if any(collected.get(f) in (None, "", "null") for f in _PREFETCH_AFTER):
+            return
+        if collected == self._speculated_on:
+            return
+        self._speculated_on = collected
+        if self._speculation is not None:
+            self._speculation.cancel()
+        self._speculation = asyncio.ensure_future(self._speculate(list(conversation)))
+        self._speculation.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _speculate(self, conversation: list[dict[str, str]]):
+        """Parse the chat so far and start the research agents on the result."""
+        with self._usage_scope("prefetch", "planning", "Planner"):
+            trip_request = await self._parse_input(get_provider("planning"), conversation)
+        context = trip_request.to_context_dict()
+        agents = {
+            "destination": ("Destination", DestinationAgent),
+            "weather": ("Weather", WeatherAgent),
+            "activities": ("Activities", ActivityAgent),
+            "flights": ("Flights", FlightAgent),
+        }
+        if trip_request.prebooked_flights:
+            del agents["flights"]
+        for name, (label, agent_cls) in agents.items():
+            self.prefetch.start(
+                name, input_key(context, _PREFETCH_FIELDS[name]),
+                lambda label=label, agent_cls=agent_cls: self._prefetch_job(label, agent_cls, context),
+            )
+
+    async def _prefetch_job(self, label: str, agent_cls: type, context: dict) -> Any:
+        with self._usage_scope("prefetch", "research", label):
+            return await agent_cls(get_provider("research")).run(context)
+
+    async def _prefetched(self, name: str, context: dict) -> Any:
+        """The speculative result for this stage if it ran on the same inputs, else MISS."""
+        if self._speculation is not None:
+            await asyncio.wait([self._speculation])  # Its jobs may not be registered yet
+        return await self.prefetch.take(name, input_key(context, _PREFETCH_FIELDS[name]))
 
-        convo_text = f"Today's date: {today}\n\nConversation so far:\n"
-        for msg in conversation:
-            role = "User" if msg["role"] == "user" else "Assistant"
-            convo_text += f"{role}: {msg['content']}\n"
+    async def plan_trip(
+        self, conversation: list[dict[str, str]], on_day: DayCallback | None = None
+    ) -> Itinerary:
+        """Full pipeline: parse conversation -> dispatch agents -> assemble itinerary.
 
-        return await planning_llm.complete_json(GATHER_SYSTEM_PROMPT, convo_text)
+        Runs the stage graph from `plan_graph()`; the finished graph, with
+        per-stage timings, is kept on `self.last_plan_graph` for inspection.
 
-    async def plan_trip(self, conversation: list[dict[str, str]]) -> Itinerary:
-        """Full pipeline: parse conversation -> dispatch agents -> assemble itinerary."""
-        # Step 1: Parse the full conversation into a structured request
+        If on_day is given, the itinerary is streamed and each DayPlan is passed
+        to it as soon as it has been generated.
+        """
+        # Closed on return, so the research prefetch is discarded before plan_trip returns
+        async with aclosing(self.plan_trip_results(conversation, on_day)) as results:
+            async for name, result in results:
+                if name == "itinerary":
+                    self._report("Writer", "Done!")
+                    return result
+        raise RuntimeError("Plan graph finished without an itinerary")
+
+    async def plan_trip_results(
+        self, conversation: list[dict[str, str]], on_day: DayCallback | None = None
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """plan_trip, yielding each stage's output as soon as it is ready.
+
+        Yields (stage name, output) pairs, e.g. ("request", TripRequest) and
+        ("flights", [FlightOption, ...]), so callers can show research while
+        the rest is still running; "itinerary" comes last. Research agents
+        that time out yield their defaults (see `agent_timeouts_s` and
+        `research_deadline_s`).
+        """
+        graph = self.plan_graph(on_day)
+        self.last_plan_graph = graph
+        results = graph.results(
+            {"conversation": conversation},
+            on_stage=self._report,
+            deadline_s=settings.research_deadline_s,
+        )
+        try:
+            async with aclosing(results):
+                async for name, result in results:
+                    yield name, result
+        finally:
+            # Anything not picked up was for inputs the final request changed
+            self.prefetch.discard()
+            self._speculation = self._speculated_on = None
+
+    def plan_graph(self, on_day: DayCallback | None = None) -> StageGraph:
+        """The plan_trip pipeline: each stage starts as soon as its inputs resolve.
+
+        Research agents start the moment the request is parsed, or reuse what
+        gather_details prefetched for the same request fields. Hotels uses
+        the country Destination resolves when it arrives within
+        _DESTINATION_WAIT_S, and goes ahead without it otherwise. Each
+        research stage is cancelled after its `agent_timeouts_s` entry.
+        """
+        timeouts = settings.agent_timeouts_s
+        research = {"isolate_errors": True, "default": list}
+        return StageGraph(
+            [
+                Stage("request", self._parse_stage, requires=("conversation",)),
+                Stage(
+                    "destination", self._destination_stage, requires=("request",),
+                    isolate_errors=True, label="Destination", timeout_s=timeouts.get("destination"),
+                ),
+                Stage(
+                    "flights", self._flights_stage, requires=("request",),
+                    label="Flights", timeout_s=timeouts.get("flights"), **research,
+                ),
+                Stage(
+                    "hotels", self._hotels_stage, requires=("request",),
+                    optional=("destination",), optional_wait_s=_DESTINATION_WAIT_S,
+                    label="Hotels", timeout_s=timeouts.get("hotels"), **research,
+                ),
+                Stage(
+                    "activities", self._activities_stage, requires=("request",),
+                    label="Activities", timeout_s=timeouts.get("activities"), **research,
+                ),
+                Stage(
+                    "weather", self._weather_stage, requires=("request",),
+                    label="Weather", timeout_s=timeouts.get("weather"), **research,
+                ),
+                Stage(
+                    "itinerary",
+                    lambda inputs: self._assemble_stage(inputs, on_day),
+                    requires=("request", "flights", "hotels", "activities", "weather", "destination"),
+                ),
+            ],
+            seeds=("conversation",),
+        )
+
+    async def _parse_stage(self, inputs: dict[str, Any]) -> TripRequest:
         self._report("Planner", "Parsing your trip request...")
         planning_llm = get_provider("planning")
-        trip_request = await self._parse_input(planning_llm, conversation)
+        with self._usage_scope("parse", "planning", "Planner"):
+            trip_request = await self._parse_input(planning_llm, inputs["conversation"])
         date_range = f"{trip_request.departure_date} to {trip_request.return_date}" if trip_request.return_date else f"{trip_request.departure_date} (one-way)"
         self._report("Planner", f"Got it — {trip_request.destination}, {date_range}")
+        self._report("Agents", "Researching...")
+        return trip_request
 
-        # Step 2: Dispatch agents in parallel with error isolation
-        research_llm = get_provider("research")
-        context = trip_request.to_context_dict()
-
-        agent_tasks: dict[str, Any] = {}
-
-        # Skip flight/hotel agents if user already booked them
-        if not trip_request.prebooked_flights:
-            agent_tasks["Flights"] = FlightAgent(research_llm).run(context)
-        else:
+    @staticmethod
+    def _research_context(inputs: dict[str, Any]) -> dict:
+        context = inputs["request"].to_context_dict()
+        if inputs.get("destination"):
+            context["country"] = inputs["destination"].country
+        return context
+
+    async def _destination_stage(self, inputs: dict[str, Any]) -> DestinationInfo | None:
+        context = self._research_context(inputs)
+        if (prefetched := await self._prefetched("destination", context)) is not MISS:
+            return prefetched
+        with self._usage_scope("research", "research", "Destination"):
+            return await DestinationAgent(get_provider("research")).run(context)
+
+    async def _flights_stage(self, inputs: dict[str, Any]) -> list[FlightOption]:
+        # Skip the flight search if the user already booked
+        if inputs["request"].prebooked_flights:
             self._report("Flights", "Using your pre-booked flight")
-
-        if not trip_request.prebooked_hotels:
-            agent_tasks["Hotels"] = self._dispatch_hotels(research_llm, trip_request, context)
-        else:
+            return self._prebooked_to_flight_options(inputs["request"])
+        context = self._research_context(inputs)
+        if (prefetched := await self._prefetched("flights", context)) is not MISS:
+            return prefetched
+        with self._usage_scope("research", "research", "Flights"):
+            return await FlightAgent(get_provider("research")).run(context)
+
+    async def _hotels_stage(self, inputs: dict[str, Any]) -> list[HotelOption]:
+        if inputs["request"].prebooked_hotels:
             self._report("Hotels", "Using your pre-booked hotel(s)")
+            return self._prebooked_to_hotel_options(inputs["request"])
+        with self._usage_scope("research", "research", "Hotels"):
+            return await self._dispatch_hotels(
+                get_provider("research"), inputs["request"], self._research_context(inputs)
+            )
 
-        agent_tasks["Activities"] = ActivityAgent(research_llm).run(context)
-        agent_tasks["Weather"] = WeatherAgent(research_llm).run(context)
-        agent_tasks["Destination"] = DestinationAgent(research_llm).run(context)
-
-        self._report("Agents", "Researching...")
-        results = await self._run_agents(agent_tasks)
-
-        # Use pre-booked items or agent results
-        if trip_request.prebooked_flights:
-            flights = self._prebooked_to_flight_options(trip_request)
-        else:
-            flights = results.get("Flights", [])
-
-        if trip_request.prebooked_hotels:
-            hotels = self._prebooked_to_hotel_options(trip_request)
-        else:
-            hotels = results.get("Hotels", [])
-        activities = results.get("Activities", [])
-        weather = results.get("Weather", [])
-        dest_info = results.get("Destination")
-
-        # Step 3: Assemble itinerary
+    async def _activities_stage(self, inputs: dict[str, Any]) -> list[Activity]:
+        context = self._research_context(inputs)
+        if (prefetched := await self._prefetched("activities", context)) is not MISS:
+            return prefetched
+        with self._usage_scope("research", "research", "Activities"):
+            return await ActivityAgent(get_provider("research")).run(context)
+
+    async def _weather_stage(self, inputs: dict[str, Any]) -> list[DayWeather]:
+        context = self._research_context(inputs)
+        if (prefetched := await self._prefetched("weather", context)) is not MISS:
+            return prefetched
+        with self._usage_scope("research", "research", "Weather"):
+            return await WeatherAgent(get_provider("research")).run(context)
+
+    async def _assemble_stage(self, inputs: dict[str, Any], on_day: DayCallback | None) -> Itinerary:
         self._report("Writer", "Assembling your itinerary...")
         writing_llm = get_provider("writing")
-        itinerary = await self._assemble_itinerary(
-            writing_llm, trip_request, flights, hotels, activities, weather, dest_info
-        )
-        self._report("Writer", "Done!")
-        return itinerary
-
-    async def _run_agents(self, agent_tasks: dict[str, Any]) -> dict[str, Any]:
-        """Run all agents in parallel, catching individual failures."""
-        results = {}
-
-        async def _safe_run(name: str, coro):
-            try:
-                result = await coro
-                self._report(name, "Done")
-                return name, result
-            except Exception as e:
-                self._report(name, f"Failed ({type(e).__name__}), skipping")
-                return name, self._default_for(name)
-
-        tasks = [_safe_run(name, coro) for name, coro in agent_tasks.items()]
-        for name, result in await asyncio.gather(*tasks):
-            results[name] = result
-
-        return results
-
-    @staticmethod
-    def _default_for(agent_name: str):
-        """Return a safe default when an agent fails."""
-        if agent_name == "Destination":
-            return None
-        return []
+        with self._usage_scope("assemble", "writing", "Writer"):
+            return await self._assemble_itinerary(
+                writing_llm, inputs["request"], inputs["flights"], inputs["hotels"],
+                inputs["activities"], inputs["weather"], inputs["destination"],
+                on_day=on_day,
+            )
 
     async def _dispatch_hotels(self, llm, trip_request: TripRequest, context: dict):
         """Dispatch hotel searches — one per overnight city, or single for simple trips."""
@@ -562,16 +890,98 @@ class Orchestrator:
         return options
 
     async def _parse_input(self, llm, conversation: list[dict[str, str]]) -> TripRequest:
-        today = date.today().isoformat()
-        convo_text = f"Today's date: {today}\n\nConversation:\n"
-        for msg in conversation:
-            role = "User" if msg["role"] == "user" else "Assistant"
-            convo_text += f"{role}: {msg['content']}\n"
-        data = await llm.complete_json(PARSE_SYSTEM_PROMPT, convo_text)
-        return TripRequest(**data)
+        messages = await self.conversation.messages(llm, conversation, self._date_preamble())
+        messages.append({
+            "role": "user",
+            "content": "That's everything. Extract my trip details from this conversation.",
+        })
+        return await llm.complete_structured(PARSE_SYSTEM_PROMPT, messages, TripRequest)
+
+    async def _write_itinerary(
+        self, llm, system_prompt: str, user_msg: str, on_day: DayCallback | None
+    ) -> ItineraryDraft:
+        """Request a schema-constrained itinerary, streaming each finished day to on_day.
+
+        When a long trip is cut off at max_tokens, the finished days are kept
+        and only the remaining ones are requested (up to llm_max_continuations).
+        """
+        draft, truncated = await self._request_draft(llm, system_prompt, user_msg, on_day)
+        for _ in range(settings.llm_max_continuations):
+            if not truncated:
+                break
+            written = ", ".join(str(d.number) for d in draft.days) or "none"
+            next_day = max((d.number for d in draft.days), default=0) + 1
+            continue_msg = (
+                f"{user_msg}\n\n"
+                f"Your previous reply was cut off. Days already written: {written}. "
+                f"Return ONLY the remaining days, starting from day {next_day}, plus "
+                "budget_breakdown and practical_tips. Leave title, date_range and "
+                "destination_summary empty."
+            )
+            tail, truncated = await self._request_draft(llm, system_prompt, continue_msg, on_day)
+            draft = self._merge_drafts(draft, tail)
+        return draft
+
+    async def _request_draft(
+        self, llm, system_prompt: str, user_msg: str, on_day: DayCallback | None
+    ) -> tuple[ItineraryDraft, bool]:
+        """One itinerary request; also returns whether it hit max_tokens."""
+        schema = json_schema_for(ItineraryDraft)
+        try:
+            if on_day is None:
+                data = await llm.complete_json(system_prompt, user_msg, schema, max_tokens=16384)
+            else:
+                day_stream = JSONArrayStream("days")
+                chunks = []
+                async for chunk in llm.stream_json(
+                    system_prompt, user_msg, schema, max_tokens=16384
+                ):
+                    chunks.append(chunk)
+                    for day in day_stream.feed(chunk):
+                        try:
+                            on_day(DayPlan(**day))
+                        except ValidationError:
+                            continue  # Dropped again when the draft is validated
+                data = parse_json_text("".join(chunks))
+        except TruncatedResponseError as e:
+            try:
+                data = salvage_json(e.partial)
+            except ValueError:
+                data = {}
+            return self._draft_from(data), True
+        return self._draft_from(data), False
+
+    @staticmethod
+    def _draft_from(data) -> ItineraryDraft:
+        """Validate an itinerary reply day by day, dropping days that don't fit."""
+        if not isinstance(data, dict):
+            return ItineraryDraft()
+        days = validate_items(data.get("days", []), DayPlan)
+        try:
+            draft = ItineraryDraft.model_validate({**data, "days": []})
+        except ValidationError:
+            draft = ItineraryDraft()
+        draft.days = days
+        return draft
+
+    @staticmethod
+    def _merge_drafts(head: ItineraryDraft, tail: ItineraryDraft) -> ItineraryDraft:
+        """Join a cut-off draft with the continuation that finished it."""
+        written = {d.number for d in head.days}
+        return ItineraryDraft(
+            title=head.title or tail.title,
+            destination=head.destination or tail.destination,
+            date_range=head.date_range or tail.date_range,
+            destination_summary=head.destination_summary or tail.destination_summary,
+            days=head.days + [d for d in tail.days if d.number not in written],
+            # These come after the days, so the head may only hold part of them
+            budget_breakdown=tail.budget_breakdown or head.budget_breakdown,
+            practical_tips=tail.practical_tips or head.practical_tips,
+        )
 
     async def _assemble_itinerary(
-        self, llm, request, flights, hotels, activities, weather, dest_info
+        self, llm, request, flights, hotels, activities, weather, dest_info,
+        on_day: DayCallback | None = None,
     ) -> Itinerary:
         # Build hotels_by_city grouping for multi-city trips
         hotels_by_city: list[CityHotels] = []
@@ -590,133 +1000,528 @@ class Orchestrator:
 
         gathered = {
             "trip_request": request.model_dump(mode="json"),
-            "flight_options": [f.model_dump(mode="json") for f in flights],
-            "hotel_options": [h.model_dump(mode="json") for h in hotels],
-            "activities": [a.model_dump(mode="json") for a in activities],
-            "weather_forecast": [w.model_dump(mode="json") for w in weather],
+            "flight_options": self._dump_options(
+                self._flight_options(flights, request.prebooked_flights)
+            ),
+            "activities": self._dump_options(top_k(
+                activities, settings.llm_prompt_top_k.get("activities"),
+                key=lambda a: -(a.rating or 0),
+            )),
+            "weather_forecast": self._dump_options(weather),
             "destination_info": dest_info.model_dump(mode="json") if dest_info else None,
         }
         if hotels_by_city:
-            gathered["hotels_by_city"] = [ch.model_dump(mode="json") for ch in hotels_by_city]
+            # Each city's options are listed there, so the flat list would repeat them
+            gathered["hotels_by_city"] = [
+                {
+                    **ch.model_dump(mode="json", exclude={"options"}),
+                    "options": self._dump_options(
+                        self._hotel_options(ch.options, request.prebooked_hotels)
+                    ),
+                }
+                for ch in hotels_by_city
+            ]
+        else:
+            gathered["hotel_options"] = self._dump_options(
+                self._hotel_options(hotels, request.prebooked_hotels)
+            )
         if request.prebooked_flights:
             gathered["prebooked_flights"] = True
         if request.prebooked_hotels:
             gathered["prebooked_hotels"] = True
 
-        user_msg = (
-            "Here is all the gathered travel data. "
-            "Create a cohesive day-by-day itinerary.\n\n"
-            f"{json.dumps(gathered, indent=2, default=str)}"
-        )
-
-        data = await llm.complete_json(ITINERARY_SYSTEM_PROMPT, user_msg, max_tokens=16384)
+        draft = None
+        dates = self._trip_dates(request)
+        min_days = settings.itinerary_map_reduce_min_days
+        if min_days is not None and len(dates) >= min_days:
+            draft = await self._write_map_reduce(
+                llm, dates, request, gathered, hotels_by_city, activities, weather, on_day
+            )
+        if draft is None:
+            user_msg = (
+                "Here is all the gathered travel data. "
+                "Create a cohesive day-by-day itinerary.\n\n"
+                f"{to_prompt_json(gathered)}"
+            )
+            tier = model_tier("writing")
+            check_context(tier.models.values(), tier.max_tokens, ITINERARY_SYSTEM_PROMPT, user_msg)
+            draft = await self._write_itinerary(llm, ITINERARY_SYSTEM_PROMPT, user_msg, on_day)
 
         return Itinerary(
-            title=data.get("title", f"Trip to {request.destination}"),
+            title=draft.title or f"Trip to {request.destination}",
             destination=request.destination,
-            date_range=data.get("date_range", ""),
-            destination_summary=data.get("destination_summary", ""),
+            date_range=draft.date_range,
+            destination_summary=draft.destination_summary,
             flights=flights,
             hotels=hotels,
             hotels_by_city=hotels_by_city,
             activities=activities,
             weather_forecast=weather,
             destination_info=dest_info,
-            days=[DayPlan(**d) for d in data.get("days", [])],
-            budget_breakdown=data.get("budget_breakdown", {}),
-            practical_tips=data.get("practical_tips", []),
+            days=draft.days,
+            budget_breakdown=draft.budget_breakdown,
+            practical_tips=draft.practical_tips,
         )
 
     @staticmethod
-    def _itinerary_to_refinement_dict(itinerary: Itinerary) -> dict:
+    def _trip_dates(request: TripRequest) -> list[date]:
+        end = request.return_date or max(
+            (cs.check_out for cs in request.city_stays), default=request.departure_date
+        )
+        return [
+            request.departure_date + timedelta(days=i)
+            for i in range(max((end - request.departure_date).days, 0) + 1)
+        ]
+
+    async def _write_map_reduce(
+        self, llm, dates: list[date], request: TripRequest, gathered: dict,
+        hotels_by_city: list[CityHotels], activities: list[Activity], weather: list[DayWeather],
+        on_day: DayCallback | None,
+    ) -> ItineraryDraft | None:
+        """Write a long itinerary as an outline, concurrent days, then an overview.
+
+        Each day is written from only its own activities, weather and hotels
+        plus the outline, so its prompt and reply stay small however long the
+        trip is. Returns None if the outline or a day can't be produced, for
+        the caller to fall back to writing the trip in one request.
+        """
+        self._report("Writer", f"Outlining {len(dates)} days...")
+        outline_data = {
+            k: v for k, v in gathered.items() if k not in ("hotel_options", "hotels_by_city")
+        }
+        outline_data["activities"] = [
+            {k: a[k] for k in ("name", "category", "duration_hours", "address") if k in a}
+            for a in gathered["activities"]
+        ]
+        outline_data["dates"] = [d.isoformat() for d in dates]
+        try:
+            skeleton = await llm.complete_structured(
+                SKELETON_SYSTEM_PROMPT,
+                f"Outline this {len(dates)}-day trip.\n\n{to_prompt_json(outline_data)}",
+                ItinerarySkeleton, max_tokens=4096,
+            )
+        except ValueError:
+            return None
+        by_date: dict[date, DayOutline] = {}
+        for day in skeleton.days:
+            by_date.setdefault(day.date, day)
+        if not set(dates) <= set(by_date):
+            return None
+        days = [
+            by_date[d].model_copy(update={"number": i}) for i, d in enumerate(dates, start=1)
+        ]
+
+        self._report("Writer", f"Writing {len(days)} days in parallel...")
+        activities_by_name = {a.name: a for a in activities}
+        outline = [d.model_dump(mode="json", exclude={"notes"}) for d in days]
+        trip = request.model_dump(mode="json", include={
+            "destination", "travelers", "interests", "preferences", "budget_allocation",
+            "lodging_type", "transit_preferences",
+        })
+
+        async def write_day(day: DayOutline) -> DayPlan:
+            context = {
+                "trip": trip,
+                "outline": outline,
+                "day": day.model_dump(mode="json"),
+                "activities": self._dump_options(
+                    [activities_by_name[n] for n in day.activities if n in activities_by_name]
+                ),
+                "weather_forecast": self._dump_options(
+                    [w for w in weather if w.date == day.date and w.city in (None, day.city)]
+                    or [w for w in weather if w.date == day.date]
+                ),
+            }
+            if hotels_by_city:
+                context["hotels"] = next(
+                    (dumped for ch, dumped in zip(hotels_by_city, gathered["hotels_by_city"])
+                     if ch.check_in <= day.date < ch.check_out),
+                    gathered["hotels_by_city"][-1],
+                )
+            else:
+                context["hotel_options"] = gathered["hotel_options"]
+            if day.number in (1, len(days)):
+                context["flight_options"] = gathered["flight_options"]
+            plan = await llm.complete_structured(
+                DAY_SYSTEM_PROMPT, f"Write day {day.number}.\n\n{to_prompt_json(context)}",
+                DayPlan, max_tokens=2048,
+            )
+            return plan.model_copy(update={"number": day.number, "date": day.date})
+
+        tasks = [asyncio.ensure_future(write_day(d)) for d in days]
+        try:
+            plans = await asyncio.gather(*tasks)
+        except ValueError:
+            self._report("Writer", "A day couldn't be written, writing the whole trip at once")
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+        # Previewed only now: after a fallback the one-request writer
+        # previews every day again
+        if on_day:
+            for plan in plans:
+                on_day(plan)
+
+        self._report("Writer", "Adding the budget and tips...")
+        overview_data = {
+            k: v for k, v in gathered.items() if k not in ("activities", "weather_forecast")
+        }
+        overview_data["days"] = [
+            {"number": p.number, "date": p.date.isoformat(), "city": d.city,
+             "title": p.title, "estimated_cost_usd": p.estimated_cost_usd}
+            for p, d in zip(plans, days)
+        ]
+        try:
+            overview = await llm.complete_structured(
+                OVERVIEW_SYSTEM_PROMPT,
+                f"Finish this itinerary.\n\n{to_prompt_json(overview_data)}",
+                ItineraryOverview, max_tokens=4096,
+            )
+        except ValueError:
+            overview = ItineraryOverview()  # The days are what matter most
+        return ItineraryDraft(
+            title=skeleton.title,
+            destination=request.destination,
+            date_range=skeleton.date_range,
+            destination_summary=overview.destination_summary,
+            days=list(plans),
+            budget_breakdown=overview.budget_breakdown,
+            practical_tips=overview.practical_tips,
+        )
+
+    @staticmethod
+    def _dump_options(options: list) -> list[dict]:
+        """Option models for a prompt, without nulls or fields left at their defaults."""
+        return [o.model_dump(mode="json", exclude_none=True, exclude_defaults=True) for o in options]
+
+    @staticmethod
+    def _flight_options(flights: list[FlightOption], prebooked: bool) -> list[FlightOption]:
+        """The cheapest flights, in price order so "option 3 of 5" is the mid-range one."""
+        if prebooked:
+            return flights  # Confirmed bookings are never pruned
+        return top_k(flights, settings.llm_prompt_top_k.get("flights"), key=lambda f: f.total_price_usd)
+
+    @staticmethod
+    def _hotel_options(hotels: list[HotelOption], prebooked: bool) -> list[HotelOption]:
+        if prebooked:
+            return hotels
+        return top_k(hotels, settings.llm_prompt_top_k.get("hotels"), key=lambda h: h.total_price_usd)
+
+    @classmethod
+    def _itinerary_to_refinement_dict(cls, itinerary: Itinerary) -> dict:
         """Serialize itinerary to dict for refinement/suggestion prompts."""
-        return {
+        data = {
             "title": itinerary.title,
             "destination": itinerary.destination,
             "date_range": itinerary.date_range,
             "destination_summary": itinerary.destination_summary,
-            "flights": [f.model_dump(mode="json") for f in itinerary.flights],
-            "hotels": [h.model_dump(mode="json") for h in itinerary.hotels],
-            "hotels_by_city": [
-                {"city": ch.city, "nights": ch.nights, "options": [h.model_dump(mode="json") for h in ch.options]}
-                for ch in itinerary.hotels_by_city
-            ],
-            "days": [d.model_dump(mode="json") for d in itinerary.days],
+            "flights": cls._dump_options(cls._flight_options(itinerary.flights, False)),
+            "days": [d.model_dump(mode="json", exclude_none=True) for d in itinerary.days],
             "budget_breakdown": itinerary.budget_breakdown,
             "practical_tips": itinerary.practical_tips,
         }
+        if itinerary.hotels_by_city:
+            data["hotels_by_city"] = [
+                {
+                    "city": ch.city,
+                    "nights": ch.nights,
+                    "options": cls._dump_options(cls._hotel_options(ch.options, False)),
+                }
+                for ch in itinerary.hotels_by_city
+            ]
+        else:
+            data["hotels"] = cls._dump_options(cls._hotel_options(itinerary.hotels, False))
+        return data
 
     async def refine_itinerary(
-        self, current_itinerary: Itinerary, user_request: str
+        self, current_itinerary: Itinerary, user_request: str,
+        on_day: DayCallback | None = None,
+    ) -> Itinerary:
+        """Modify an existing itinerary based on user feedback.
+
+        Structural edits (swapping days, moving or dropping a time slot) are
+        applied locally without an LLM. Otherwise the model is asked for a
+        patch of just the changed fields; the full itinerary is only
+        regenerated if the patch doesn't apply.
+        """
+        return await self._refine(current_itinerary, user_request, on_day)
+
+    async def _refine(
+        self, current_itinerary: Itinerary, user_request: str,
+        on_day: DayCallback | None = None, speculative: bool = False,
     ) -> Itinerary:
-        """Modify an existing itinerary based on user feedback."""
+        """refine_itinerary; speculative runs report no progress and bill to "precompute".
+
+        A speculative run raises PatchError rather than rewriting the whole
+        itinerary, leaving that expensive fallback to a live refinement.
+        """
+        local = local_refinement(current_itinerary, user_request)
+        if local is not None:
+            itinerary, changed_days = local
+            if on_day:
+                for day in changed_days:
+                    on_day(day)
+            return itinerary
+
         writing_llm = get_provider("writing")
         current_data = self._itinerary_to_refinement_dict(current_itinerary)
 
         user_msg = (
-            f"Current itinerary:\n{json.dumps(current_data, indent=2, default=str)}\n\n"
+            f"Current itinerary:\n{to_prompt_json(current_data)}\n\n"
             f"User request: {user_request}"
         )
 
-        data = await writing_llm.complete_json(REFINE_SYSTEM_PROMPT, user_msg, max_tokens=16384)
+        phase = "precompute" if speculative else "refine"
+        with self._usage_scope(phase, "writing", "Refiner"):
+            patched = await self._refine_by_patch(
+                writing_llm, current_itinerary, user_msg, on_day, report=not speculative
+            )
+            if patched is not None:
+                return patched
+            if speculative:
+                raise PatchError("Refinement needs a full rewrite")
+            draft = await self._write_itinerary(writing_llm, REFINE_SYSTEM_PROMPT, user_msg, on_day)
 
         return Itinerary(
-            title=data.get("title", current_itinerary.title),
-            destination=data.get("destination", current_itinerary.destination),
-            date_range=data.get("date_range", current_itinerary.date_range),
-            destination_summary=data.get("destination_summary", current_itinerary.destination_summary),
+            title=draft.title or current_itinerary.title,
+            destination=draft.destination or current_itinerary.destination,
+            date_range=draft.date_range or current_itinerary.date_range,
+            destination_summary=draft.destination_summary or current_itinerary.destination_summary,
             flights=current_itinerary.flights,
             hotels=current_itinerary.hotels,
             hotels_by_city=current_itinerary.hotels_by_city,
             activities=current_itinerary.activities,
             weather_forecast=current_itinerary.weather_forecast,
             destination_info=current_itinerary.destination_info,
-            days=[DayPlan(**d) for d in data.get("days", current_itinerary.days)],
-            budget_breakdown=data.get("budget_breakdown", current_itinerary.budget_breakdown),
-            practical_tips=data.get("practical_tips", current_itinerary.practical_tips),
+            days=draft.days or current_itinerary.days,
+            budget_breakdown=draft.budget_breakdown or current_itinerary.budget_breakdown,
+            practical_tips=draft.practical_tips or current_itinerary.practical_tips,
         )
 
+    async def _refine_by_patch(
+        self, llm, current_itinerary: Itinerary, user_msg: str, on_day: DayCallback | None,
+        report: bool = True,
+    ) -> Itinerary | None:
+        """Apply the model's patch for a refinement, or None to fall back to a rewrite."""
+        try:
+            data = await llm.complete_json(
+                REFINE_PATCH_SYSTEM_PROMPT, user_msg, json_schema_for(ItineraryPatch),
+                max_tokens=8192,
+            )
+            patch = ItineraryPatch.model_validate(data)
+            if patch.rewrite:
+                return None
+            itinerary, changed_days = apply_patch(current_itinerary, patch)
+        except TruncatedResponseError:
+            return None  # Half a patch would silently drop changes
+        except ValueError:
+            if report:
+                self._report("Refiner", "Patch didn't apply, rewriting the itinerary")
+            return None
+        if on_day:
+            for day in changed_days:
+                on_day(day)
+        return itinerary
+
     async def classify_refinement(self, user_request: str) -> str:
-        """Return 'direct' or 'suggest' based on user intent."""
-        # Fast keyword check first
-        lower = user_request.lower()
-        for pattern in _SUGGEST_PATTERNS:
-            if pattern in lower:
-                return "suggest"
+        """Return 'direct' or 'suggest' based on user intent.
+
+        Classified locally (see backend/agents/intent.py); the LLM is only
+        asked when the local prediction is below `intent_min_confidence`,
+        and its answer is recorded for the local model to learn from.
+        """
+        # Fast checks first: structural edits are applied directly
+        if is_structural(user_request):
+            return "direct"
+        classifier = get_intent_classifier()
+        # The first call trains the model, which would stall the event loop
+        prediction = await asyncio.to_thread(classifier.classify, user_request)
+        if prediction.confidence >= settings.intent_min_confidence:
+            return prediction.mode
 
         # Fall back to LLM classification for ambiguous cases
         try:
-            llm = get_provider("planning")
-            result = await llm.complete_json(
-                CLASSIFY_REFINEMENT_PROMPT,
-                f"User message: {user_request}",
-            )
-            return result.get("mode", "direct")
+            llm = get_provider("classify")
+            with self._usage_scope("refine", "classify", "Classifier"):
+                result = await llm.complete_json(
+                    CLASSIFY_REFINEMENT_PROMPT,
+                    f"User message: {user_request}",
+                )
         except Exception:
-            return "direct"
+            return prediction.mode
+        mode = result.get("mode", prediction.mode)
+        classifier.record(user_request, mode)
+        return mode
 
     async def suggest_alternatives(
         self, current_itinerary: Itinerary, user_request: str
     ) -> dict:
-        """Return 3 alternative suggestions for part of the itinerary."""
+        """Return 3 alternative suggestions for part of the itinerary.
+
+        They are the first page of a pool of `suggestion_pool_size`
+        generated in one call, which more_alternatives() pages through.
+        While the user reads them, each suggestion is applied in the
+        background (see precompute_suggestions) so the pick is instant.
+        Raises SuggestionsExhaustedError if none could be generated.
+        """
+        self.discard_suggestions()
+        self._precompute_spent = []
+        pool = SuggestionPool(user_request, self._itinerary_key(current_itinerary))
+        self._suggestion_pool = pool
+        await self._fill_pool(pool, current_itinerary)
+        if pool.remaining == 0:
+            raise SuggestionsExhaustedError(f"No alternatives found for: {user_request}")
+        return self._serve_page(pool, current_itinerary)
+
+    async def more_alternatives(
+        self, current_itinerary: Itinerary, user_request: str
+    ) -> dict:
+        """The next 3 alternatives for the same request, from the pool when possible.
+
+        Raises SuggestionsExhaustedError once a refill adds nothing new.
+        """
+        pool = self._suggestion_pool
+        if (
+            pool is None
+            or pool.request != user_request
+            or pool.itinerary_key != self._itinerary_key(current_itinerary)
+        ):
+            return await self.suggest_alternatives(current_itinerary, user_request)
+        self.discard_precomputed()
+        if pool.remaining == 0 and self._pool_refill is not None:
+            await asyncio.wait([self._pool_refill])
+        if pool.remaining == 0:
+            await self._fill_pool(pool, current_itinerary)
+        if pool.remaining == 0:
+            raise SuggestionsExhaustedError(f"No more alternatives for: {user_request}")
+        return self._serve_page(pool, current_itinerary)
+
+    def _serve_page(self, pool: SuggestionPool, itinerary: Itinerary) -> dict:
+        """Take the next page, refilling the pool in the background once it runs low."""
+        page = pool.next_page(_SUGGESTION_PAGE_SIZE)
+        refilling = self._pool_refill is not None and not self._pool_refill.done()
+        if pool.remaining < _SUGGESTION_PAGE_SIZE and not refilling:
+            self._pool_refill = asyncio.ensure_future(self._fill_pool(pool, itinerary))
+            self._pool_refill.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self.precompute_suggestions(itinerary, page)
+        return page
+
+    async def _fill_pool(self, pool: SuggestionPool, itinerary: Itinerary):
+        """Ask for `suggestion_pool_size` more alternatives, excluding those already pooled."""
         writing_llm = get_provider("writing")
-        current_data = self._itinerary_to_refinement_dict(current_itinerary)
+        current_data = self._itinerary_to_refinement_dict(itinerary)
 
         user_msg = (
-            f"Current itinerary:\n{json.dumps(current_data, indent=2, default=str)}\n\n"
-            f"User request: {user_request}"
+            f"Current itinerary:\n{to_prompt_json(current_data)}\n\n"
+            f"User request: {pool.request}\n\n"
+            f"Suggest {settings.suggestion_pool_size} alternatives."
         )
+        if pool.candidates:
+            names = "; ".join(c["name"] for c in pool.candidates)
+            user_msg += f" These were already suggested, don't repeat them: {names}."
+
+        with self._usage_scope("refine", "writing", "Suggester"):
+            result = await writing_llm.complete_json(SUGGEST_SYSTEM_PROMPT, user_msg)
+        if not pool.candidates:
+            pool.target_description = result.get("target_description", "")
+            pool.day_number = result.get("day_number", 1)
+            pool.time_slot = result.get("time_slot", "afternoon")
+        pool.add(result.get("suggestions", []))
+
+    @staticmethod
+    def _itinerary_key(itinerary: Itinerary) -> str:
+        return input_key({"itinerary": itinerary.model_dump(mode="json")}, ["itinerary"])
+
+    @classmethod
+    def _suggestion_job(
+        cls, itinerary: Itinerary, suggestion: dict, day_number: int, time_slot: str
+    ) -> tuple[str, str]:
+        """Prefetcher name and key for one suggestion applied to one itinerary."""
+        choice = {"suggestion": suggestion, "day_number": day_number, "time_slot": time_slot}
+        name = "suggestion:" + input_key(choice, choice)
+        return name, cls._itinerary_key(itinerary)
+
+    def precompute_suggestions(self, itinerary: Itinerary, suggestions: dict):
+        """Apply every suggestion in the background, ready for apply_suggestion.
+
+        At most `suggestion_precompute_concurrency` run at a time, and none
+        starts once precomputing for this suggestion request, over all its
+        pages, has cost `suggestion_precompute_max_cost_usd` (counting calls
+        still running). Suggestions that need a full rewrite are not
+        precomputed.
+        """
+        limit = settings.suggestion_precompute_concurrency
+        if limit <= 0:
+            return
+        day_number = suggestions.get("day_number", 1)
+        time_slot = suggestions.get("time_slot", "afternoon")
+        slots = asyncio.Semaphore(limit)
+        spent = self._precompute_spent
+
+        async def apply(name: str, suggestion: dict) -> Itinerary:
+            async with slots:
+                cost = sum(c.cost_usd for calls in spent for c in calls)
+                if cost >= settings.suggestion_precompute_max_cost_usd:
+                    raise RuntimeError("Suggestion precompute budget spent")
+                self._precompute_started.add(name)
+                with capture_calls() as calls:
+                    spent.append(calls)
+                    return await self._refine(
+                        itinerary, self._suggestion_directive(suggestion, day_number, time_slot),
+                        speculative=True,
+                    )
+
+        for suggestion in suggestions.get("suggestions", []):
+            if not isinstance(suggestion, dict) or not suggestion.get("name"):
+                continue
+            name, key = self._suggestion_job(itinerary, suggestion, day_number, time_slot)
+            self.prefetch.start(
+                name, key, lambda name=name, suggestion=suggestion: apply(name, suggestion)
+            )
+
+    def discard_precomputed(self):
+        """Cancel suggestions being applied in the background."""
+        self.prefetch.discard("suggestion:")
+        self._precompute_started.clear()
+
+    def discard_suggestions(self):
+        """Be done with the current suggestions: their pool, its refill and precomputed picks."""
+        self.discard_precomputed()
+        if self._pool_refill is not None:
+            self._pool_refill.cancel()
+        self._pool_refill = None
+        self._suggestion_pool = None
 
-        return await writing_llm.complete_json(SUGGEST_SYSTEM_PROMPT, user_msg)
+    @staticmethod
+    def _suggestion_directive(suggestion: dict, day_number: int, time_slot: str) -> str:
+        return (
+            f"Replace the {time_slot} activity on Day {day_number} with: "
+            f"{suggestion['name']} — {suggestion.get('description', '')}. "
+            f"Estimated cost: ${suggestion.get('estimated_cost_usd', 0)}."
+        )
 
     async def apply_suggestion(
         self, current_itinerary: Itinerary, suggestion: dict,
         day_number: int, time_slot: str,
+        on_day: DayCallback | None = None,
     ) -> Itinerary:
-        """Apply a chosen suggestion to the itinerary."""
-        directive = (
-            f"Replace the {time_slot} activity on Day {day_number} with: "
-            f"{suggestion['name']} — {suggestion['description']}. "
-            f"Estimated cost: ${suggestion.get('estimated_cost_usd', 0)}."
-        )
-        return await self.refine_itinerary(current_itinerary, directive)
+        """Apply a chosen suggestion to the itinerary.
+
+        Uses the result precomputed while the suggestions were shown if
+        there is one, waiting for it if it's still running. One still
+        queued for a precompute slot is dropped, as refining now is quicker
+        than waiting for a sibling to finish first. The rest of the
+        suggestions are discarded before anything is awaited.
+        """
+        name, key = self._suggestion_job(current_itinerary, suggestion, day_number, time_slot)
+        if name in self._precompute_started:
+            self.prefetch.discard("suggestion:", keep=name)
+        else:
+            self.discard_precomputed()
+        precomputed = await self.prefetch.take(name, key)
+        self.discard_suggestions()
+        if precomputed is not MISS:
+            return precomputed
+        directive = self._suggestion_directive(suggestion, day_number, time_slot)
+        return await self.refine_itinerary(current_itinerary, directive, on_day=on_day)
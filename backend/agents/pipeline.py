@@ -0,0 +1,226 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+# Called with (stage label, status) as labelled stages finish or fail
+StageCallback = Callable[[str, str], None]
+
+
+class StageTimeoutError(TimeoutError):
+    """A stage ran past its timeout or the run's deadline and was cancelled."""
+
+
+@dataclass
+class Stage:
+    """One node of a pipeline graph.
+
+    `run` receives a dict of its inputs by name and returns the stage's
+    output, published under the stage's name. Required inputs must resolve
+    first. Optional inputs are waited on for at most `optional_wait_s` after
+    that, then passed as None if still pending, so a stage can start on
+    partial inputs instead of waiting for a slow upstream.
+
+    With `isolate_errors`, a failed stage publishes `default()` instead of
+    failing the pipeline. A stage still running `timeout_s` after it started
+    is cancelled and fails with StageTimeoutError.
+    """
+    name: str
+    run: Callable[[dict[str, Any]], Awaitable[Any]]
+    requires: tuple[str, ...] = ()
+    optional: tuple[str, ...] = ()
+    optional_wait_s: float = 0.0
+    isolate_errors: bool = False
+    default: Callable[[], Any] = lambda: None
+    label: str = ""  # If set, completion and failure are reported under this name
+    timeout_s: float | None = None
+
+
+@dataclass
+class StageRun:
+    """What happened to one stage during a run, for inspection."""
+    status: str = "pending"  # pending | running | done | failed | timed_out | skipped
+    started_s: float | None = None  # Offsets from the start of the run
+    finished_s: float | None = None
+    error: str | None = None
+    missing_optional: list[str] = field(default_factory=list)
+
+
+class StageGraph:
+    """Runs stages as soon as their dependencies resolve.
+
+    Names that no stage produces must be seeded when calling `run()`.
+    The graph is validated (unknown inputs, cycles) when it's built.
+    """
+
+    def __init__(self, stages: list[Stage], seeds: tuple[str, ...] = ()):
+        self.stages = {s.name: s for s in stages}
+        self.seeds = seeds
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate stage names")
+        known = set(self.stages) | set(seeds)
+        for stage in stages:
+            unknown = set(stage.requires + stage.optional) - known
+            if unknown:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown {sorted(unknown)}")
+        self.order = self._topological_order()
+        self.runs: dict[str, StageRun] = {}
+
+    def _topological_order(self) -> list[str]:
+        order: list[str] = []
+        done = set(self.seeds)
+        remaining = dict(self.stages)
+        while remaining:
+            ready = [
+                name for name, s in remaining.items()
+                if set(s.requires + s.optional) <= done
+            ]
+            if not ready:
+                raise ValueError(f"Dependency cycle among {sorted(remaining)}")
+            for name in ready:
+                order.append(name)
+                done.add(name)
+                del remaining[name]
+        return order
+
+    def describe(self) -> dict[str, dict]:
+        """The graph as plain data: each stage's inputs, dependents and last run."""
+        graph = {}
+        for name in self.order:
+            stage = self.stages[name]
+            run = self.runs.get(name)
+            graph[name] = {
+                "requires": list(stage.requires),
+                "optional": list(stage.optional),
+                "dependents": [
+                    other.name for other in self.stages.values()
+                    if name in other.requires + other.optional
+                ],
+                "isolate_errors": stage.isolate_errors,
+                "last_run": vars(run) if run else None,
+            }
+        return graph
+
+    async def run(
+        self,
+        seeds: dict[str, Any] | None = None,
+        on_stage: StageCallback | None = None,
+        deadline_s: float | None = None,
+    ) -> dict[str, Any]:
+        """Run every stage and return all outputs (seeds included) by name."""
+        outputs = dict(seeds or {})
+        async for name, result in self.results(seeds, on_stage, deadline_s):
+            outputs[name] = result
+        return outputs
+
+    async def results(
+        self,
+        seeds: dict[str, Any] | None = None,
+        on_stage: StageCallback | None = None,
+        deadline_s: float | None = None,
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """Run every stage, yielding (name, output) pairs in completion order.
+
+        `deadline_s` bounds the whole run for stages with `isolate_errors`:
+        any still running that long after the start are timed out like a
+        stage past its own `timeout_s`, and publish their defaults. Raises
+        the first error of a stage that isn't isolated.
+        """
+        seeds = seeds or {}
+        missing = set(self.seeds) - set(seeds)
+        if missing:
+            raise ValueError(f"Missing seed values {sorted(missing)}")
+        report = on_stage or (lambda *_: None)
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        outputs: dict[str, asyncio.Future] = {}
+        for name, value in seeds.items():
+            outputs[name] = loop.create_future()
+            outputs[name].set_result(value)
+        for name in self.stages:
+            outputs[name] = loop.create_future()
+        self.runs = {name: StageRun() for name in self.order}
+
+        def time_limit(stage: Stage) -> float | None:
+            limit = stage.timeout_s
+            if deadline_s is not None and stage.isolate_errors:
+                remaining = max(deadline_s - (time.monotonic() - start), 0.0)
+                limit = remaining if limit is None else min(limit, remaining)
+            return limit
+
+        async def call(stage: Stage, inputs: dict[str, Any]) -> Any:
+            limit = time_limit(stage)
+            if limit is None:
+                return await stage.run(inputs)
+            # Waiting on a task (not wait_for) keeps timeouts raised inside
+            # the stage, e.g. by an HTTP client, distinct from this one
+            task = asyncio.ensure_future(stage.run(inputs))
+            try:
+                done, _ = await asyncio.wait([task], timeout=limit)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            if not done:
+                task.cancel()
+                raise StageTimeoutError(f"Stage {stage.name!r} timed out after {limit:.3g}s")
+            return task.result()
+
+        async def run_stage(stage: Stage):
+            run = self.runs[stage.name]
+            try:
+                # asyncio.wait rather than awaiting futures directly, so a
+                # cancelled stage never cancels an output others depend on
+                required = [outputs[r] for r in stage.requires]
+                if required:
+                    await asyncio.wait(required)
+                upstream_error = next((f.exception() for f in required if f.exception()), None)
+                if upstream_error is not None:
+                    # The pipeline is already failing because of it
+                    run.status = "skipped"
+                    outputs[stage.name].set_exception(upstream_error)
+                    return
+                inputs = {r: outputs[r].result() for r in stage.requires}
+
+                pending = [outputs[o] for o in stage.optional if not outputs[o].done()]
+                if pending and stage.optional_wait_s > 0:
+                    await asyncio.wait(pending, timeout=stage.optional_wait_s)
+                for o in stage.optional:
+                    ready = outputs[o].done() and outputs[o].exception() is None
+                    inputs[o] = outputs[o].result() if ready else None
+                    if not ready:
+                        run.missing_optional.append(o)
+
+                run.status, run.started_s = "running", round(time.monotonic() - start, 3)
+                result = await call(stage, inputs)
+                run.status = "done"
+                if stage.label:
+                    report(stage.label, "Done")
+            except Exception as e:
+                timed_out = isinstance(e, StageTimeoutError)
+                run.status = "timed_out" if timed_out else "failed"
+                run.error = f"{type(e).__name__}: {e}"
+                if not stage.isolate_errors:
+                    outputs[stage.name].set_exception(e)
+                    return
+                if stage.label:
+                    reason = "Timed out" if timed_out else f"Failed ({type(e).__name__})"
+                    report(stage.label, f"{reason}, skipping")
+                result = stage.default()
+            finally:
+                run.finished_s = round(time.monotonic() - start, 3)
+            outputs[stage.name].set_result(result)
+
+        tasks = [asyncio.create_task(run_stage(self.stages[name])) for name in self.order]
+        waiting = {outputs[name]: name for name in self.order}
+        try:
+            while waiting:
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for future in sorted(done, key=lambda f: self.order.index(waiting[f])):
+                    yield waiting.pop(future), future.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            for future in outputs.values():
+                if future.done() and not future.cancelled():
+                    future.exception()  # Mark retrieved; the first error was already raised
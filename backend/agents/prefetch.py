@@ -0,0 +1,75 @@
+import asyncio
+import json
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+# Returned by Prefetcher.take() when there is no usable result
+MISS = object()
+
+
+def input_key(context: dict, fields: Iterable[str]) -> str:
+    """A comparable key for the given context fields; dotted names reach into dicts."""
+    picked = {}
+    for name in fields:
+        value: Any = context
+        for part in name.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        picked[name] = value
+    return json.dumps(picked, sort_keys=True, default=str)
+
+
+class Prefetcher:
+    """Speculative background work, reusable only for the inputs it started from.
+
+    Each named job remembers the key of the inputs it was launched with.
+    Starting a job again with a different key cancels the stale one, and
+    `take()` hands back a result only when the caller's key matches.
+    """
+
+    def __init__(self):
+        self._jobs: dict[str, tuple[str, asyncio.Task]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, name: str, key: str, make: Callable[[], Awaitable[Any]]) -> bool:
+        """Launch `make()` under `name` unless it is already running for `key`."""
+        current = self._jobs.get(name)
+        if current is not None:
+            if current[0] == key:
+                return False
+            current[1].cancel()
+        task = asyncio.ensure_future(make())
+        # Failures only mean the result can't be reused; never log them as unretrieved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._jobs[name] = (key, task)
+        return True
+
+    async def take(self, name: str, key: str) -> Any:
+        """The job's result if it ran for `key` and succeeded, else MISS.
+
+        The job is removed either way; a mismatched one is cancelled.
+        """
+        job = self._jobs.pop(name, None)
+        if job is None:
+            self.misses += 1
+            return MISS
+        job_key, task = job
+        if job_key != key:
+            task.cancel()
+            self.misses += 1
+            return MISS
+        try:
+            await asyncio.wait([task])
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if task.cancelled() or task.exception() is not None:
+            self.misses += 1
+            return MISS
+        self.hits += 1
+        return task.result()
+
+    def discard(self, prefix: str = "", keep: str | None = None):
+        """Cancel and forget every job whose name starts with `prefix`, except `keep`."""
+        for name in [n for n in self._jobs if n.startswith(prefix) and n != keep]:
+            self._jobs.pop(name)[1].cancel()
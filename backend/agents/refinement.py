@@ -0,0 +1,227 @@
+import re
+from dataclasses import dataclass, field
+
+from pydantic import ValidationError
+
+from backend.models.itinerary import DayPlan, Itinerary, ItineraryPatch
+
+
+class PatchError(ValueError):
+    """A refinement patch doesn't apply cleanly to the itinerary."""
+
+
+class SuggestionsExhaustedError(LookupError):
+    """The LLM came up with no alternatives that haven't been shown already."""
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def apply_patch(itinerary: Itinerary, patch: ItineraryPatch) -> tuple[Itinerary, list[DayPlan]]:
+    """Return the patched itinerary and the days that changed.
+
+    Raises PatchError for a patch that changes nothing or refers to days,
+    tips or budget categories that don't exist, or if a patched day or
+    budget no longer validates.
+    """
+    if not (patch.days or patch.budget_deltas or patch.tips_added or patch.tips_removed):
+        raise PatchError("Patch is empty")
+
+    days = {d.number: d for d in itinerary.days}
+    changed: dict[int, DayPlan] = {}
+    for day_patch in patch.days:
+        current = changed.get(day_patch.number) or days.get(day_patch.number)
+        if current is None:
+            raise PatchError(f"Patch refers to day {day_patch.number}, which doesn't exist")
+        updates = day_patch.model_dump(exclude={"number"}, exclude_none=True)
+        for slot in ("title", "morning", "afternoon", "evening"):
+            if slot in updates and not updates[slot].strip():
+                raise PatchError(f"Patch leaves day {day_patch.number} {slot} empty")
+        try:
+            changed[day_patch.number] = DayPlan.model_validate({**current.model_dump(), **updates})
+        except ValidationError as e:
+            raise PatchError(f"Patched day {day_patch.number} is invalid: {e}") from e
+
+    budget = dict(itinerary.budget_breakdown)
+    for category, delta in patch.budget_deltas.items():
+        if category not in budget:
+            raise PatchError(f"Patch changes a budget category that doesn't exist: {category!r}")
+        budget[category] = round(budget.get(category, 0.0) + delta, 2)
+        if budget[category] < 0:
+            raise PatchError(f"Patch makes the {category} budget negative")
+
+    tips = list(itinerary.practical_tips)
+    for removed in patch.tips_removed:
+        match = next((t for t in tips if _normalize(t) == _normalize(removed)), None)
+        if match is None:
+            raise PatchError(f"Patch removes a tip that doesn't exist: {removed!r}")
+        tips.remove(match)
+    tips += [t for t in patch.tips_added if t.strip()]
+
+    patched = itinerary.model_copy(update={
+        "days": [changed.get(d.number, d) for d in itinerary.days],
+        "budget_breakdown": budget,
+        "practical_tips": tips,
+    })
+    return patched, [changed[n] for n in sorted(changed)]
+
+
+# A day's plan; the number, date and weather stay with the date when days move
+_PLAN_FIELDS = (
+    "title", "morning", "afternoon", "evening", "estimated_cost_usd",
+    "alt_weather_note", "alt_morning", "alt_afternoon", "alt_evening",
+)
+
+_DAY = r"day\s*(\d+)"
+_SLOT = r"(morning|afternoon|evening)"
+_NOUN = r"(?:\s+(?:plans?|activit(?:y|ies)|slot))?"
+_SWAP_DAYS = re.compile(
+    rf"(?:swap|switch|exchange|flip)\s+days?\s*(\d+)\s+(?:and|with|for|&)\s+(?:day\s*)?(\d+)"
+)
+_MOVE_SLOT = re.compile(
+    rf"(?:move|shift|swap|switch)\s+(?:the\s+)?(?:{_DAY}\s+)?{_SLOT}{_NOUN}"
+    rf"(?:\s+(?:on|of|from)\s+{_DAY})?"
+    rf"\s+(?:to|and|with)\s+(?:the\s+)?(?:{_DAY}\s+)?{_SLOT}{_NOUN}"
+    rf"(?:\s+(?:on|of)\s+{_DAY})?"
+)
+_DROP_SLOT = re.compile(
+    rf"(?:drop|remove|delete|clear|cancel|skip|cut)\s+(?:the\s+)?(?:{_DAY}\s+)?{_SLOT}{_NOUN}"
+    rf"(?:\s+(?:on|of|for|from)\s+{_DAY})?"
+)
+_POLITE = re.compile(r"^(?:(?:please|can you|could you|would you|let's|lets)\s+)+|[.!?\s]+$")
+
+
+def _int(*groups: str | None) -> int | None:
+    return next((int(g) for g in groups if g), None)
+
+
+def _swap_days(itinerary: Itinerary, a: int, b: int) -> list[DayPlan] | None:
+    days = {d.number: d for d in itinerary.days}
+    if a == b or a not in days or b not in days:
+        return None
+    plan_a = {f: getattr(days[a], f) for f in _PLAN_FIELDS}
+    plan_b = {f: getattr(days[b], f) for f in _PLAN_FIELDS}
+    return [days[a].model_copy(update=plan_b), days[b].model_copy(update=plan_a)]
+
+
+def _move_slot(
+    itinerary: Itinerary, src_day: int, src: str, dst_day: int, dst: str
+) -> list[DayPlan] | None:
+    """Exchange two slots (and their rain alternatives), so neither is left empty.
+
+    Not across days that have cost estimates, which only an LLM can split.
+    """
+    days = {d.number: d for d in itinerary.days}
+    if (src_day, src) == (dst_day, dst) or src_day not in days or dst_day not in days:
+        return None
+    if src_day != dst_day and (days[src_day].estimated_cost_usd or days[dst_day].estimated_cost_usd):
+        return None
+    moving = (getattr(days[src_day], src), getattr(days[src_day], f"alt_{src}"))
+    displaced = (getattr(days[dst_day], dst), getattr(days[dst_day], f"alt_{dst}"))
+    if src_day == dst_day:
+        day = days[src_day].model_copy(update={
+            dst: moving[0], f"alt_{dst}": moving[1], src: displaced[0], f"alt_{src}": displaced[1],
+        })
+        return [day]
+    return [
+        days[src_day].model_copy(update={src: displaced[0], f"alt_{src}": displaced[1]}),
+        days[dst_day].model_copy(update={dst: moving[0], f"alt_{dst}": moving[1]}),
+    ]
+
+
+def _drop_slot(itinerary: Itinerary, number: int, slot: str) -> list[DayPlan] | None:
+    """Clear a slot, unless the day has a cost estimate the slot may be part of."""
+    day = next((d for d in itinerary.days if d.number == number), None)
+    if day is None or day.estimated_cost_usd:
+        return None
+    return [day.model_copy(update={slot: f"Free {slot} — nothing planned.", f"alt_{slot}": None})]
+
+
+def _command(request: str) -> tuple[str, re.Match] | None:
+    text = _POLITE.sub("", request.strip().lower())
+    for name, pattern in (("swap", _SWAP_DAYS), ("move", _MOVE_SLOT), ("drop", _DROP_SLOT)):
+        if m := pattern.fullmatch(text):
+            return name, m
+    return None
+
+
+def is_structural(request: str) -> bool:
+    """Whether local_refinement understands the request (it may still find no such day)."""
+    return _command(request) is not None
+
+
+def local_refinement(itinerary: Itinerary, request: str) -> tuple[Itinerary, list[DayPlan]] | None:
+    """Apply a purely structural request without an LLM, if it is one.
+
+    Handles swapping two days (plans move, dates and weather stay with the
+    day number), moving a time slot within a day or across days without
+    cost estimates (the displaced slot takes its place) and dropping a slot
+    from a day without a cost estimate (only an LLM can tell what a slot
+    cost). Returns the new
+    itinerary and the changed days, or None for anything else, including
+    references to days the itinerary doesn't have.
+    """
+    command = _command(request)
+    if command is None:
+        return None
+    name, m = command
+    changed = None
+    if name == "swap":
+        changed = _swap_days(itinerary, int(m[1]), int(m[2]))
+    elif name == "move":
+        src_day, dst_day = _int(m[1], m[3]), _int(m[4], m[6])
+        if src_day or dst_day:
+            changed = _move_slot(itinerary, src_day or dst_day, m[2], dst_day or src_day, m[5])
+    elif number := _int(m[1], m[3]):
+        changed = _drop_slot(itinerary, number, m[2])
+    if not changed:
+        return None
+    by_number = {d.number: d for d in changed}
+    days = [by_number.get(d.number, d) for d in itinerary.days]
+    return itinerary.model_copy(update={"days": days}), changed
+
+
+@dataclass
+class SuggestionPool:
+    """Alternatives generated for one request, served a page at a time.
+
+    Candidates are deduplicated by name, so refills can't repeat anything
+    already shown.
+    """
+    request: str
+    itinerary_key: str
+    target_description: str = ""
+    day_number: int = 1
+    time_slot: str = "afternoon"
+    candidates: list[dict] = field(default_factory=list)
+    served: int = 0
+
+    @property
+    def remaining(self) -> int:
+        return len(self.candidates) - self.served
+
+    def add(self, suggestions: list) -> int:
+        """Add new candidates, skipping malformed ones and repeats; returns how many were added."""
+        seen = {_normalize(c["name"]) for c in self.candidates}
+        added = 0
+        for suggestion in suggestions:
+            if not isinstance(suggestion, dict) or not suggestion.get("name"):
+                continue
+            name = _normalize(suggestion["name"])
+            if name not in seen:
+                seen.add(name)
+                self.candidates.append(suggestion)
+                added += 1
+        return added
+
+    def next_page(self, size: int) -> dict:
+        """The next `size` candidates in suggest_alternatives' format, numbered from 1."""
+        page = self.candidates[self.served:self.served + size]
+        self.served += len(page)
+        return {
+            "target_description": self.target_description,
+            "day_number": self.day_number,
+            "time_slot": self.time_slot,
+            "suggestions": [{**s, "id": i} for i, s in enumerate(page, start=1)],
+        }
@@ -162,15 +162,11 @@ class WeatherAgent(Agent):
         self, city: str, start: date, end: date
     ) -> list[DayWeather]:
         user_msg = f"Weather forecast for {city} from {start.isoformat()} to {end.isoformat()}."
-        data = await self.llm.complete_json(FALLBACK_PROMPT, user_msg)
-        items = data if isinstance(data, list) else data.get("forecast", [])
-        results = []
-        for w in items:
-            day = DayWeather(**w)
+        days = await self.llm.complete_structured(FALLBACK_PROMPT, user_msg, DayWeather, many=True)
+        for day in days:
             day.city = city
             day.source = "historical_estimate"
-            results.append(day)
-        return results
+        return days
 
     async def _fetch_llm(self, context: dict) -> list[DayWeather]:
         user_msg = (
@@ -181,11 +177,7 @@ class WeatherAgent(Agent):
             user_msg += f" to {context['return_date']}"
         user_msg += "."
 
-        data = await self.llm.complete_json(FALLBACK_PROMPT, user_msg)
-        items = data if isinstance(data, list) else data.get("forecast", [])
-        results = []
-        for w in items:
-            day = DayWeather(**w)
+        days = await self.llm.complete_structured(FALLBACK_PROMPT, user_msg, DayWeather, many=True)
+        for day in days:
             day.source = "historical_estimate"
-            results.append(day)
-        return results
+        return days
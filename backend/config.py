@@ -16,6 +16,120 @@ class Settings(BaseSettings):
     default_claude_model: str = "claude-sonnet-4-20250514"
     default_openai_model: str = "gpt-4o"
 
+    # Model tier per task type: a model per vendor (omitted = the defaults
+    # above), an output-token ceiling, and a latency budget per provider
+    # attempt (time to first chunk for streams) before falling back.
+    llm_task_tiers: dict[str, dict[str, str | int | float]] = {
+        "classify": {
+            "claude": "claude-3-5-haiku-20241022", "openai": "gpt-4.1-nano",
+            "max_tokens": 512, "latency_budget_s": 15,
+        },
+        "gather": {
+            "claude": "claude-3-5-haiku-20241022", "openai": "gpt-4o-mini",
+            "max_tokens": 2048, "latency_budget_s": 30,
+        },
+        "research": {
+            "claude": "claude-3-5-haiku-20241022", "openai": "gpt-4o-mini",
+            "max_tokens": 4096, "latency_budget_s": 90,
+        },
+        "planning": {"max_tokens": 4096, "latency_budget_s": 90},
+        "writing": {"max_tokens": 16384, "latency_budget_s": 300},
+        "default": {"max_tokens": 4096, "latency_budget_s": 120},
+    }
+
+    # Per-vendor request limits, enforced process-wide for each model
+    llm_rate_limits: dict[str, dict[str, int]] = {
+        "claude": {"rpm": 50, "input_tpm": 30000, "max_in_flight": 8},
+        "openai": {"rpm": 500, "input_tpm": 30000, "max_in_flight": 16},
+        "default": {"rpm": 50, "input_tpm": 30000, "max_in_flight": 8},
+    }
+
+    # Retries on transient errors (429/5xx/overloaded/connection) before falling
+    # back to another provider; the deadline bounds one call including retries
+    llm_retry_max_attempts: int = 4
+    llm_retry_base_delay_s: float = 0.5
+    llm_retry_max_delay_s: float = 20.0
+    llm_call_deadline_s: float | None = 300.0
+
+    # Follow-up requests for the rest of a JSON reply cut off at max_tokens
+    llm_max_continuations: int = 2
+
+    # Planner chats past this many estimated tokens fold older turns into a
+    # rolling summary, keeping the most recent turns verbatim
+    llm_conversation_summary_tokens: int = 3000
+    llm_conversation_keep_turns: int = 6
+
+    # Start Destination, Weather, Activities and Flights in the background
+    # while the planner chat is still gathering details, once it has the
+    # destination, origin, dates and travelers
+    research_prefetch: bool = True
+
+    # Research agents still running past their own timeout, or this long
+    # after plan_trip started, are cancelled and the itinerary is written
+    # without them. None disables a limit.
+    agent_timeouts_s: dict[str, float | None] = {
+        "destination": 60, "flights": 90, "hotels": 90, "activities": 60, "weather": 45,
+    }
+    research_deadline_s: float | None = 150.0
+
+    # Trips of at least this many days are written as an outline, then every
+    # day concurrently, then the budget and tips; shorter ones in one request.
+    # None always uses one request.
+    itinerary_map_reduce_min_days: int | None = 8
+
+    # Alternatives generated per suggestion call; "more" pages through them
+    # three at a time and the pool is refilled in the background when low
+    suggestion_pool_size: int = 12
+
+    # Refinement requests are classified locally; only predictions below this
+    # confidence ask the LLM, whose decisions are logged to train on (the
+    # most recent this many; retraining takes longer the more there are)
+    intent_min_confidence: float = 0.75
+    intent_log_path: str = ".voyager_cache/intent_decisions.jsonl"
+    intent_max_logged_examples: int = 2000
+
+    # While suggested alternatives are on screen, each is applied in the
+    # background so the user's pick is instant: this many at a time (0
+    # disables), starting no more once the batch has cost this much
+    suggestion_precompute_concurrency: int = 2
+    suggestion_precompute_max_cost_usd: float = 0.25
+
+    # Options per category sent to the writer (cheapest flights and hotels per
+    # city, best-rated activities); the full lists stay on the Itinerary
+    llm_prompt_top_k: dict[str, int] = {"flights": 5, "hotels": 5, "activities": 30}
+
+    # Hedged requests: also ask the fallback provider once the primary is slower
+    # than this percentile of its recent latency (default delay until warmed up)
+    llm_hedging_enabled: bool = False
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_samples: int = 20
+    llm_hedge_default_delay_s: float = 20.0
+
+    # Circuit breaker: skip a provider after repeated failures or a high error
+    # rate over its recent calls, probing it again after the cooldown
+    llm_circuit_failure_threshold: int = 3
+    llm_circuit_error_rate: float = 0.5
+    llm_circuit_window: int = 20
+    llm_circuit_cooldown_s: float = 30.0
+
+    # LLM response cache
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = ".voyager_cache/llm_responses.sqlite3"
+    llm_cache_max_mb: int = 200
+    llm_cache_ttl_seconds: dict[str, int] = {
+        "planning": 6 * 3600,
+        "research": 24 * 3600,
+        "writing": 6 * 3600,
+        "default": 3600,
+    }
+
+    # Record/replay LLM exchanges for offline runs and benchmarks:
+    # "off", "record" (call providers and save) or "replay" (serve saved only).
+    # Replay latency is "none", "recorded" or "sampled" from the cassette.
+    llm_cassette_mode: str = "off"
+    llm_cassette_dir: str = "cassettes"
+    llm_replay_latency: str = "none"
+
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
 
@@ -1,57 +1,243 @@
-import json
+import time
+from collections.abc import AsyncIterator
 
 import anthropic
 
 from backend.config import settings
-from backend.llm.base import LLMProvider, LLMResponse
+from backend.llm.base import (
+    HTTP2_AVAILABLE,
+    LLMProvider,
+    LLMResponse,
+    Messages,
+    TruncatedResponseError,
+    as_messages,
+    estimate_tokens,
+)
+from backend.llm.json_stream import parse_json_text
+from backend.llm.latency import within_budget
+from backend.llm.ratelimit import rate_limiter
+from backend.llm.retry import RetryPolicy
+from backend.llm.usage import record_call
+
+JSON_INSTRUCTION = (
+    "\n\nYou MUST respond with valid JSON only. No markdown, no explanation, just JSON."
+)
+
+
+def _cached_system(system_prompt: str) -> list[dict]:
+    """Mark the system prompt as a cache breakpoint.
+
+    System prompts are static per call site, so repeated calls read the
+    prefix from Anthropic's prompt cache instead of reprocessing it. Prompts
+    below the model's minimum cacheable length are simply not cached.
+    """
+    return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+def _respond_tool(response_schema: dict) -> dict:
+    """Force a single tool call whose input must match the response schema."""
+    return {
+        "tools": [{
+            "name": "respond",
+            "description": "Return the response in the required structure.",
+            "input_schema": response_schema,
+        }],
+        "tool_choice": {"type": "tool", "name": "respond"},
+    }
+
+
+def _messages(user_message: str | Messages, prefill: str) -> list[dict]:
+    """Chat turns, plus an assistant turn the model continues from when prefilled.
+
+    A multi-turn conversation gets a cache breakpoint on its latest turn, so
+    the next turn reads everything before it from the prompt cache.
+    """
+    messages: list[dict] = as_messages(user_message)
+    if len(messages) > 1:
+        last = messages[-1]
+        messages[-1] = {
+            "role": last["role"],
+            "content": [{
+                "type": "text", "text": last["content"], "cache_control": {"type": "ephemeral"},
+            }],
+        }
+    if prefill:
+        messages.append({"role": "assistant", "content": prefill})
+    return messages
+
+
+def _text(resp) -> str:
+    return "".join(block.text for block in resp.content if block.type == "text")
+
+
+def _usage(usage) -> dict[str, int]:
+    return {
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "cache_read_input_tokens": usage.cache_read_input_tokens or 0,
+        "cache_creation_input_tokens": usage.cache_creation_input_tokens or 0,
+    }
 
 
 class ClaudeProvider(LLMProvider):
     def __init__(self, model: str | None = None, api_key: str | None = None):
         self.client = anthropic.AsyncAnthropic(
-            api_key=api_key or settings.anthropic_api_key
+            api_key=api_key or settings.anthropic_api_key,
+            http_client=anthropic.DefaultAsyncHttpxClient(http2=HTTP2_AVAILABLE),
+            max_retries=0,  # Retries are handled by self.retry_policy
         )
         self.model = model or settings.default_claude_model
+        self.retry_policy = RetryPolicy.from_settings()
+
+    async def _create(self, system_prompt: str, user_message: str | Messages, prefill: str = "", **params):
+        """messages.create with rate limiting, retries and usage accounting."""
+        limiter = rate_limiter("claude", self.model)
+        tokens = estimate_tokens(system_prompt, user_message, prefill)
+        attempts = 0
+
+        async def attempt():
+            nonlocal attempts
+            attempts += 1
+            async with limiter.slot(tokens):
+                return await within_budget(self.client.messages.create(
+                    model=self.model,
+                    system=_cached_system(system_prompt),
+                    messages=_messages(user_message, prefill),
+                    **params,
+                ))
+
+        start = time.monotonic()
+        resp = await self.retry_policy.run(attempt)
+        record_call("claude", self.model, _usage(resp.usage), time.monotonic() - start, attempts - 1)
+        return resp
 
     async def complete(
         self,
         system_prompt: str,
-        user_message: str,
+        user_message: str | Messages,
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> LLMResponse:
-        resp = await self.client.messages.create(
-            model=self.model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_message}],
+        resp = await self._create(
+            system_prompt, user_message, max_tokens=max_tokens, temperature=temperature
         )
         return LLMResponse(
-            content=resp.content[0].text,
+            content=_text(resp),
             model=self.model,
-            usage={
-                "input_tokens": resp.usage.input_tokens,
-                "output_tokens": resp.usage.output_tokens,
-            },
+            usage=_usage(resp.usage),
+            truncated=resp.stop_reason == "max_tokens",
         )
 
     async def complete_json(
         self,
         system_prompt: str,
-        user_message: str,
+        user_message: str | Messages,
         response_schema: dict | None = None,
         max_tokens: int = 4096,
     ) -> dict:
-        full_system = (
-            system_prompt
-            + "\n\nYou MUST respond with valid JSON only. No markdown, no explanation, just JSON."
-        )
-        resp = await self.complete(full_system, user_message, temperature=0.2, max_tokens=max_tokens)
-        text = resp.content.strip()
-        # Strip markdown code fences if present
-        if text.startswith("```"):
-            text = text.split("\n", 1)[1] if "\n" in text else text[3:]
-            if text.endswith("```"):
-                text = text[:-3].strip()
-        return json.loads(text)
+        if response_schema is None:
+            # A reply cut off at max_tokens is prefilled back as the assistant
+            # turn, so the model picks up exactly where it stopped
+            full_system = system_prompt + JSON_INSTRUCTION
+            text = ""
+            for _ in range(settings.llm_max_continuations + 1):
+                resp = await self._create(
+                    full_system, user_message, prefill=text,
+                    max_tokens=max_tokens, temperature=0.2,
+                )
+                text += _text(resp)
+                if resp.stop_reason != "max_tokens":
+                    return parse_json_text(text)
+                text = text.rstrip()  # Prefills may not end in whitespace
+            raise TruncatedResponseError(text)
+
+        # Tool input is streamed rather than read off the final message: a
+        # tool_use block cut off at max_tokens parses to {}, while the raw
+        # deltas leave TruncatedResponseError a partial document to salvage
+        chunks = [
+            chunk async for chunk in self._stream(
+                system_prompt, user_message, max_tokens=max_tokens, temperature=0.2,
+                **_respond_tool(response_schema),
+            )
+        ]
+        text = "".join(chunks)
+        return parse_json_text(text) if text.strip() else {}
+
+    async def stream(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        try:
+            async for text in self._stream(
+                system_prompt, user_message, max_tokens=max_tokens, temperature=temperature
+            ):
+                yield text
+        except TruncatedResponseError:
+            return  # A cut-off text reply is still worth showing
+
+    async def _stream(self, system_prompt: str, user_message: str | Messages, **params) -> AsyncIterator[str]:
+        """Streaming counterpart of `_create`, yielding text or tool-input JSON deltas.
+
+        Raises TruncatedResponseError after the last chunk if output hit max_tokens.
+        """
+        limiter = rate_limiter("claude", self.model)
+        tokens = estimate_tokens(system_prompt, user_message)
+        attempts = 0
+        final = None
+
+        async def attempt():
+            nonlocal attempts, final
+            attempts += 1
+            async with limiter.slot(tokens):
+                async with self.client.messages.stream(
+                    model=self.model,
+                    system=_cached_system(system_prompt),
+                    messages=_messages(user_message, ""),
+                    **params,
+                ) as stream:
+                    async for event in stream:
+                        if event.type != "content_block_delta":
+                            continue
+                        if event.delta.type == "text_delta":
+                            yield event.delta.text
+                        elif event.delta.type == "input_json_delta":
+                            yield event.delta.partial_json
+                    final = await stream.get_final_message()
+
+        start = time.monotonic()
+        chunks = []
+        async for text in self.retry_policy.stream(attempt):
+            chunks.append(text)
+            yield text
+        if final is not None:
+            record_call("claude", self.model, _usage(final.usage), time.monotonic() - start, attempts - 1)
+            if final.stop_reason == "max_tokens":
+                raise TruncatedResponseError("".join(chunks))
+
+    async def stream_json(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        response_schema: dict | None = None,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        if response_schema is None:
+            params = {"max_tokens": max_tokens, "temperature": 0.2}
+            system_prompt += JSON_INSTRUCTION
+        else:
+            params = {"max_tokens": max_tokens, "temperature": 0.2, **_respond_tool(response_schema)}
+        async for text in self._stream(system_prompt, user_message, **params):
+            yield text
+
+    async def warm_up(self) -> None:
+        # Cheapest authenticated request — only here to complete the TLS handshake
+        try:
+            await self.client.models.list(limit=1)
+        except Exception:
+            pass
+
+    async def aclose(self) -> None:
+        await self.client.close()
@@ -1,6 +1,39 @@
+import importlib.util
+import json
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+
+from backend.llm.json_stream import salvage_json
+from backend.llm.schema import json_schema_for, parse_structured
+
+M = TypeVar("M", bound=BaseModel)
+
+# Chat turns, oldest first: {"role": "user" | "assistant", "content": str}.
+# Providers take either a single user message or a full list of turns.
+Messages = list[dict[str, str]]
+
+# HTTP/2 multiplexes concurrent requests over one warm connection, but httpx
+# only supports it when the optional `h2` package is installed.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def estimate_tokens(*texts: str | Messages) -> int:
+    """Rough token count (~4 characters per token) for budgeting before a call."""
+    chars = 0
+    for text in texts:
+        chars += len(text) if isinstance(text, str) else sum(len(m["content"]) for m in text)
+    return chars // 4 + 1
+
+
+def as_messages(user_message: str | Messages) -> Messages:
+    """Normalize a provider's user input to a list of chat turns."""
+    if isinstance(user_message, str):
+        return [{"role": "user", "content": user_message}]
+    return list(user_message)
 
 
 @dataclass
@@ -8,16 +41,35 @@ class LLMResponse:
     content: str
     model: str
     usage: dict[str, int] = field(default_factory=dict)
+    truncated: bool = False  # Generation stopped at max_tokens
+
+
+class TruncatedResponseError(ValueError):
+    """A JSON reply hit max_tokens before it was complete.
+
+    `partial` holds the text generated so far; `salvage_json` can recover the
+    values it finished. Another provider would hit the same limit, so this is
+    not a reason to fall back.
+    """
+
+    def __init__(self, partial: str):
+        super().__init__("LLM response was cut off at max_tokens")
+        self.partial = partial
 
 
 class LLMProvider(ABC):
     """Abstract base for all LLM providers."""
 
+    @property
+    def identity(self) -> str:
+        """Stable provider/model name, used to key cached responses."""
+        return f"{type(self).__name__}:{getattr(self, 'model', '')}"
+
     @abstractmethod
     async def complete(
         self,
         system_prompt: str,
-        user_message: str,
+        user_message: str | Messages,
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> LLMResponse: ...
@@ -26,9 +78,62 @@ class LLMProvider(ABC):
     async def complete_json(
         self,
         system_prompt: str,
-        user_message: str,
+        user_message: str | Messages,
         response_schema: dict[str, Any] | None = None,
         max_tokens: int = 4096,
     ) -> dict:
         """Return parsed JSON from the LLM response."""
         ...
+
+    async def stream(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        """Yield the response text in chunks as it is generated.
+
+        Providers without native streaming yield the whole completion at once.
+        """
+        resp = await self.complete(system_prompt, user_message, temperature, max_tokens)
+        yield resp.content
+
+    async def stream_json(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        response_schema: dict[str, Any] | None = None,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        """Yield raw JSON text in chunks; parse the joined text with `parse_json_text`."""
+        data = await self.complete_json(
+            system_prompt, user_message, response_schema, max_tokens=max_tokens
+        )
+        yield json.dumps(data)
+
+    async def complete_structured(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        model: type[M],
+        many: bool = False,
+        max_tokens: int = 4096,
+    ) -> M | list[M]:
+        """Return validated `model` instance(s), constraining output to its JSON schema.
+
+        A list cut off at max_tokens keeps the items that were finished.
+        """
+        try:
+            data = await self.complete_json(
+                system_prompt, user_message, json_schema_for(model, many), max_tokens=max_tokens
+            )
+        except TruncatedResponseError as e:
+            data = salvage_json(e.partial)
+        return parse_structured(data, model, many)
+
+    async def warm_up(self) -> None:
+        """Open a connection to the provider ahead of the first real request."""
+
+    async def aclose(self) -> None:
+        """Release the provider's HTTP connections."""
@@ -0,0 +1,239 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from backend.config import settings
+from backend.llm.base import LLMProvider, LLMResponse, Messages
+from backend.llm.json_stream import parse_json_text
+from backend.llm.usage import record_call
+
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_cache() -> Iterator[None]:
+    """Skip cache reads (responses are still stored) for calls made inside this block."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+class ResponseCache:
+    """Content-addressed LLM response store in SQLite with TTLs and LRU eviction.
+
+    Entries expire after the TTL they were written with. When the stored
+    values exceed `max_bytes`, the least recently read entries are dropped.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str, ttl_seconds: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode()), now + ttl_seconds, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+            # Keep the most recently used entries whose running size fits the budget
+            self._conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS running
+                        FROM responses
+                    ) WHERE running > ?
+                )""",
+                (self.max_bytes,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(settings.llm_cache_path, settings.llm_cache_max_mb * 1024 * 1024)
+    return _cache
+
+
+class CachedProvider(LLMProvider):
+    """Serves repeated requests from the response cache before calling `inner`."""
+
+    def __init__(self, inner: LLMProvider, task_type: str, cache: ResponseCache | None = None):
+        self.inner = inner
+        self.task_type = task_type
+        self.cache = cache or get_response_cache()
+        ttls = settings.llm_cache_ttl_seconds
+        self.ttl_seconds = ttls.get(task_type, ttls.get("default", 3600))
+
+    @property
+    def identity(self) -> str:
+        return self.inner.identity
+
+    def _key(self, kind: str, **request: Any) -> str:
+        return self.cache.make_key(provider=self.identity, kind=kind, **request)
+
+    async def _get(self, key: str) -> str | None:
+        if _bypass.get():
+            return None
+        start = time.monotonic()
+        value = await asyncio.to_thread(self.cache.get, key)
+        if value is not None:
+            record_call("cache", self.identity, {}, time.monotonic() - start, cache_hit=True)
+        return value
+
+    async def _put(self, key: str, value: str):
+        await asyncio.to_thread(self.cache.put, key, value, self.ttl_seconds)
+
+    async def complete(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> LLMResponse:
+        key = self._key(
+            "text", system=system_prompt, user=user_message,
+            temperature=temperature, max_tokens=max_tokens,
+        )
+        cached = await self._get(key)
+        if cached is not None:
+            return LLMResponse(**json.loads(cached))
+        resp = await self.inner.complete(system_prompt, user_message, temperature, max_tokens)
+        await self._put(key, json.dumps(asdict(resp)))
+        return resp
+
+    async def complete_json(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        response_schema: dict | None = None,
+        max_tokens: int = 4096,
+    ) -> dict:
+        key = self._key(
+            "json", system=system_prompt, user=user_message,
+            schema=response_schema, max_tokens=max_tokens,
+        )
+        cached = await self._get(key)
+        if cached is not None:
+            return json.loads(cached)
+        data = await self.inner.complete_json(
+            system_prompt, user_message, response_schema, max_tokens=max_tokens
+        )
+        await self._put(key, json.dumps(data))
+        return data
+
+    async def stream(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        key = self._key(
+            "text", system=system_prompt, user=user_message,
+            temperature=temperature, max_tokens=max_tokens,
+        )
+        cached = await self._get(key)
+        if cached is not None:
+            yield LLMResponse(**json.loads(cached)).content
+            return
+        chunks = []
+        async for chunk in self.inner.stream(system_prompt, user_message, temperature, max_tokens):
+            chunks.append(chunk)
+            yield chunk
+        resp = LLMResponse(content="".join(chunks), model=self.identity)
+        await self._put(key, json.dumps(asdict(resp)))
+
+    async def stream_json(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        response_schema: dict | None = None,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        # Shares entries with complete_json: a hit replays the parsed JSON in one chunk
+        key = self._key(
+            "json", system=system_prompt, user=user_message,
+            schema=response_schema, max_tokens=max_tokens,
+        )
+        cached = await self._get(key)
+        if cached is not None:
+            yield cached
+            return
+        chunks = []
+        async for chunk in self.inner.stream_json(
+            system_prompt, user_message, response_schema, max_tokens=max_tokens
+        ):
+            chunks.append(chunk)
+            yield chunk
+        try:
+            data = parse_json_text("".join(chunks))
+        except ValueError:
+            return  # Never cache a reply the caller can't parse either
+        await self._put(key, json.dumps(data))
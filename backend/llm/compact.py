@@ -0,0 +1,117 @@
+import importlib.util
+import json
+from collections.abc import Callable, Iterable
+from typing import Any, TypeVar
+
+from backend.llm.base import estimate_tokens
+
+T = TypeVar("T")
+
+# Verbose keys repeated in every option/leg/forecast entry. Keys the prompts
+# refer to by name (total_price_usd, source, ...) are deliberately left alone.
+KEY_ALIASES: dict[str, str] = {
+    "departure_airport": "from",
+    "arrival_airport": "to",
+    "departure_time": "dep",
+    "arrival_time": "arr",
+    "flight_number": "flight",
+    "duration_minutes": "mins",
+    "total_duration_minutes": "total_mins",
+    "outbound_duration_minutes": "out_mins",
+    "return_duration_minutes": "ret_mins",
+    "outbound_stops": "out_stops",
+    "return_stops": "ret_stops",
+    "outbound_leg_count": "out_legs",
+    "price_per_night_usd": "night_usd",
+    "distance_to_center_km": "center_km",
+    "temp_high_c": "hi_c",
+    "temp_low_c": "lo_c",
+    "humidity_pct": "humid_pct",
+    "rain_probability_pct": "rain_pct",
+    "duration_hours": "hours",
+}
+# Links are useless to the writer and long
+OMIT_KEYS = {"booking_url", "url"}
+
+# Input context per model, matched by model-name prefix like MODEL_PRICES
+CONTEXT_WINDOWS: dict[str, int] = {
+    "claude-": 200_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+}
+DEFAULT_CONTEXT_WINDOW = 128_000
+
+# tiktoken is optional; without it tokens are estimated from character count
+_ENCODING = None
+if importlib.util.find_spec("tiktoken") is not None:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+
+
+class ContextLimitError(ValueError):
+    """A prompt would not fit the model's context window."""
+
+
+def compact(value: Any) -> Any:
+    """Drop empty values and links, and shorten verbose keys, recursively."""
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            if key in OMIT_KEYS:
+                continue
+            item = compact(item)
+            if item is None or item == "" or item == [] or item == {}:
+                continue
+            out[KEY_ALIASES.get(key, key)] = item
+        return out
+    if isinstance(value, list):
+        return [compact(item) for item in value]
+    return value
+
+
+def to_prompt_json(data: Any) -> str:
+    """Compact JSON for a prompt, prefixed with a legend for any shortened keys."""
+    text = json.dumps(compact(data), separators=(",", ":"), ensure_ascii=False, default=str)
+    used = [f"{short}={long}" for long, short in KEY_ALIASES.items() if f'"{short}":' in text]
+    if not used:
+        return text
+    return f"Abbreviated keys: {', '.join(used)}\n{text}"
+
+
+def top_k(items: Iterable[T], k: int | None, key: Callable[[T], Any]) -> list[T]:
+    """The k best items by `key` (ascending), or all of them sorted when k is None."""
+    ranked = sorted(items, key=key)
+    return ranked if k is None else ranked[:k]
+
+
+def count_tokens(*texts: str) -> int:
+    """Token count with tiktoken when installed, otherwise a character estimate."""
+    if _ENCODING is None:
+        return estimate_tokens(*texts)
+    return sum(len(_ENCODING.encode(t)) for t in texts)
+
+
+def context_window(model: str) -> int:
+    return next(
+        (size for prefix, size in sorted(CONTEXT_WINDOWS.items(), key=lambda kv: -len(kv[0]))
+         if model.startswith(prefix)),
+        DEFAULT_CONTEXT_WINDOW,
+    )
+
+
+def check_context(models: Iterable[str], max_tokens: int, *texts: str) -> int:
+    """Raise ContextLimitError unless the prompt plus output fits every model.
+
+    Every model in a fallback chain must fit, since any of them may serve
+    the call. Local counts are approximate for Claude, so 10% is kept spare.
+    Returns the prompt's token count.
+    """
+    tokens = count_tokens(*texts)
+    for model in models:
+        limit = int(context_window(model) * 0.9) - max_tokens
+        if tokens > limit:
+            raise ContextLimitError(
+                f"Prompt is ~{tokens} tokens; {model} allows {limit} with {max_tokens} reserved for output"
+            )
+    return tokens
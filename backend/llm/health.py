@@ -0,0 +1,94 @@
+import time
+from collections import deque
+from enum import Enum
+
+from backend.config import settings
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"  # Healthy — requests flow normally
+    OPEN = "open"  # Failing — skipped in favour of other providers
+    HALF_OPEN = "half_open"  # Cooldown over — the next call's outcome decides
+
+
+class ProviderHealth:
+    """Failure tracking and circuit breaker for one provider.
+
+    The circuit opens after `failure_threshold` consecutive failures, or when
+    the error rate over the last `window` calls reaches `error_rate`. After
+    `cooldown_s` the provider is tried again; the next success closes the
+    circuit and the next failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int | None = None,
+        error_rate: float | None = None,
+        window: int | None = None,
+        cooldown_s: float | None = None,
+    ):
+        self.failure_threshold = failure_threshold or settings.llm_circuit_failure_threshold
+        self.error_rate_threshold = error_rate or settings.llm_circuit_error_rate
+        self.cooldown_s = cooldown_s or settings.llm_circuit_cooldown_s
+        self.outcomes: deque[bool] = deque(maxlen=window or settings.llm_circuit_window)
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.last_error = ""
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def is_open(self) -> bool:
+        """True while the provider should be deprioritised."""
+        if self.state == CircuitState.OPEN and time.monotonic() - self.opened_at >= self.cooldown_s:
+            self.state = CircuitState.HALF_OPEN
+        return self.state == CircuitState.OPEN
+
+    def record_success(self):
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.state = CircuitState.CLOSED
+        self.opened_at = None
+
+    def record_failure(self, error: BaseException):
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"[:200]
+        if (
+            self.state == CircuitState.HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+            or (
+                len(self.outcomes) >= self.outcomes.maxlen // 2
+                and self.error_rate >= self.error_rate_threshold
+            )
+        ):
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "error_rate": round(self.error_rate, 3),
+            "calls_in_window": len(self.outcomes),
+            "last_error": self.last_error,
+        }
+
+
+_health: dict[str, ProviderHealth] = {}
+
+
+def provider_health(identity: str) -> ProviderHealth:
+    """Return the process-wide health record for a provider identity."""
+    if identity not in _health:
+        _health[identity] = ProviderHealth()
+    return _health[identity]
+
+
+def health_snapshot() -> dict[str, dict]:
+    """Circuit state of every provider seen so far, for monitoring."""
+    return {identity: h.snapshot() for identity, h in _health.items()}
@@ -0,0 +1,217 @@
+import json
+import re
+
+# Tail of a raw JSON string that can't be decoded yet: an unfinished \uXXXX
+# escape, or a complete high surrogate still waiting for its low half.
+_PARTIAL_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{0,3}$|\\u[dD][89abAB][0-9a-fA-F]{2}$")
+
+
+def parse_json_text(text: str):
+    """Parse an LLM's JSON reply, tolerating surrounding markdown code fences."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
+        if text.endswith("```"):
+            text = text[:-3].strip()
+    return json.loads(text)
+
+
+class _JSONScanner:
+    """Tracks JSON structure over text that arrives in chunks.
+
+    Only structural characters are interpreted; anything outside the top-level
+    value (such as a leading code fence) is ignored. Subclasses hook into the
+    events they care about.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack: list[str] = []  # open containers, "{" or "["
+        self._keys: list[str | None] = []  # most recent key per open container
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+
+    def _scan(self, chunk: str):
+        self.buffer += chunk
+        while self._pos < len(self.buffer):
+            self._step(self.buffer[self._pos], self._pos)
+            self._pos += 1
+
+    def _step(self, ch: str, pos: int):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._expect_key:
+                    self._keys[-1] = json.loads(self.buffer[self._string_start:pos + 1])
+                    self._expect_key = False
+                else:
+                    self._string_closed(pos)
+            return
+
+        if ch == '"':
+            self._in_string = True
+            self._string_start = pos
+            if not self._expect_key:
+                self._string_opened(pos)
+        elif ch in "{[":
+            self._stack.append(ch)
+            self._keys.append(None)
+            self._expect_key = ch == "{"
+            self._container_opened(pos)
+        elif ch in "}]" and self._stack:
+            self._container_closing(pos)
+            self._stack.pop()
+            self._keys.pop()
+            self._expect_key = False
+        elif ch == "," and self._stack:
+            self._expect_key = self._stack[-1] == "{"
+
+    @property
+    def _current_key(self) -> str | None:
+        """Key whose value is being read, when directly inside an object."""
+        if self._stack and self._stack[-1] == "{":
+            return self._keys[-1]
+        return None
+
+    def _string_opened(self, pos: int): ...
+
+    def _string_closed(self, pos: int): ...
+
+    def _container_opened(self, pos: int): ...
+
+    def _container_closing(self, pos: int): ...
+
+
+class JSONStringFieldStream(_JSONScanner):
+    """Incrementally decodes one string field of a streamed top-level object.
+
+    `feed()` returns the newly decoded characters of the field's value, so a
+    conversational reply can be shown while the rest of the JSON is generated.
+    """
+
+    def __init__(self, field: str):
+        super().__init__()
+        self.field = field
+        self._value_start: int | None = None
+        self._value_end: int | None = None
+        self._emitted = 0
+
+    def feed(self, chunk: str) -> str:
+        self._scan(chunk)
+        if self._value_start is None:
+            return ""
+
+        if self._value_end is not None:
+            raw = self.buffer[self._value_start + 1:self._value_end]
+        else:
+            raw = self.buffer[self._value_start + 1:]
+            if self._escape:
+                raw = raw[:-1]
+            # Trimming an unfinished low surrogate can expose its high half
+            trimmed = _PARTIAL_ESCAPE.sub("", raw)
+            while trimmed != raw:
+                raw, trimmed = trimmed, _PARTIAL_ESCAPE.sub("", trimmed)
+
+        decoded = json.loads(f'"{raw}"', strict=False)
+        delta = decoded[self._emitted:]
+        self._emitted = len(decoded)
+        return delta
+
+    def _string_opened(self, pos: int):
+        if self._value_start is None and len(self._stack) == 1 and self._current_key == self.field:
+            self._value_start = pos
+
+    def _string_closed(self, pos: int):
+        if self._value_start == self._string_start and self._value_end is None:
+            self._value_end = pos
+
+
+class JSONArrayStream(_JSONScanner):
+    """Yields each element of one array field of a streamed top-level object.
+
+    `feed()` returns the elements (objects or arrays) whose closing bracket
+    arrived in that chunk, already parsed, so callers can act on the first
+    items of a long response while the rest is still being generated.
+    """
+
+    def __init__(self, field: str):
+        super().__init__()
+        self.field = field
+        self._array_depth: int | None = None
+        self._item_start: int | None = None
+        self._done = False
+        self._items: list = []
+
+    def feed(self, chunk: str) -> list:
+        self._items = []
+        self._scan(chunk)
+        return self._items
+
+    def _in_array(self) -> bool:
+        return self._array_depth is not None and not self._done
+
+    def _container_opened(self, pos: int):
+        depth = len(self._stack)
+        if self._array_depth is None:
+            if depth == 2 and self._stack == ["{", "["] and self._keys[0] == self.field:
+                self._array_depth = depth
+        elif self._in_array() and depth == self._array_depth + 1 and self._item_start is None:
+            self._item_start = pos
+
+    def _container_closing(self, pos: int):
+        if not self._in_array():
+            return
+        depth = len(self._stack)
+        if depth == self._array_depth + 1 and self._item_start is not None:
+            self._items.append(json.loads(self.buffer[self._item_start:pos + 1], strict=False))
+            self._item_start = None
+        elif depth == self._array_depth:
+            self._done = True
+
+
+class _CutPoints(_JSONScanner):
+    """Records where a truncated document could be cut and closed off."""
+
+    def __init__(self):
+        super().__init__()
+        self.cuts: list[tuple[int, tuple[str, ...]]] = []  # (end, containers left open)
+
+    def _step(self, ch: str, pos: int):
+        if not self._in_string and self._stack:
+            if ch == ",":
+                self.cuts.append((pos, tuple(self._stack)))
+            elif ch in "}]":
+                self.cuts.append((pos + 1, tuple(self._stack[:-1])))
+        super()._step(ch, pos)
+
+
+def salvage_json(text: str):
+    """Parse JSON that was cut off mid-document, keeping every finished value.
+
+    The unfinished tail is dropped and the containers still open at that
+    point are closed, so a reply that hit max_tokens keeps the list elements
+    it completed. Raises ValueError if not even one value survives.
+    """
+    try:
+        return parse_json_text(text)
+    except ValueError:
+        pass
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON found to salvage")
+    scanner = _CutPoints()
+    scanner._scan(text[min(starts):])
+    for end, stack in reversed(scanner.cuts):
+        closers = "".join("}" if c == "{" else "]" for c in reversed(stack))
+        try:
+            return json.loads(scanner.buffer[:end] + closers, strict=False)
+        except ValueError:
+            continue
+    raise ValueError("No complete JSON value to salvage")
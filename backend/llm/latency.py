@@ -0,0 +1,87 @@
+import asyncio
+import contextvars
+from collections import deque
+from collections.abc import Awaitable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies for one provider and task type."""
+
+    def __init__(self, window: int = 200):
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        """Latency at quantile p (0-1), or None before any sample is recorded."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p * (len(ordered) - 1)))]
+
+
+_trackers: dict[tuple[str, str], LatencyTracker] = {}
+
+
+def latency_tracker(identity: str, task_type: str) -> LatencyTracker:
+    """Return the process-wide tracker for a provider identity and task type."""
+    key = (identity, task_type)
+    if key not in _trackers:
+        _trackers[key] = LatencyTracker()
+    return _trackers[key]
+
+
+class LatencyBudgetError(asyncio.TimeoutError):
+    """A provider took longer than its tier's latency budget to answer a request."""
+
+
+@dataclass
+class AttemptBudget:
+    """The latency budget for each request of one provider call.
+
+    It starts once a request is past our own rate limiter, which flags the
+    time spent waiting on it as `queued`.
+    """
+    seconds: float | None
+    queued: bool = False  # Still waiting for a rate-limit slot
+
+    def blames(self, exc: BaseException) -> bool:
+        """Whether `exc` counts against the provider: not a timeout while queued."""
+        return not (isinstance(exc, asyncio.TimeoutError) and self.queued)
+
+
+_budget: contextvars.ContextVar[AttemptBudget | None] = contextvars.ContextVar(
+    "llm_attempt_budget", default=None
+)
+
+
+@contextmanager
+def attempt_budget(seconds: float | None) -> Iterator[AttemptBudget]:
+    """Apply a latency budget to each provider request made inside this block."""
+    budget = AttemptBudget(seconds)
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+def active_budget() -> AttemptBudget | None:
+    return _budget.get()
+
+
+async def within_budget(request: Awaitable[T]) -> T:
+    """Await one provider request (holding its rate-limit slot) under the active budget."""
+    budget = _budget.get()
+    if budget is None or budget.seconds is None:
+        return await request
+    try:
+        return await asyncio.wait_for(request, budget.seconds)
+    except asyncio.TimeoutError as e:
+        raise LatencyBudgetError(f"No response within {budget.seconds}s") from e
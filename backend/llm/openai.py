@@ -1,56 +1,209 @@
+import hashlib
 import json
+import time
+from collections.abc import AsyncIterator
 
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 from backend.config import settings
-from backend.llm.base import LLMProvider, LLMResponse
+from backend.llm.base import (
+    HTTP2_AVAILABLE,
+    LLMProvider,
+    LLMResponse,
+    Messages,
+    TruncatedResponseError,
+    as_messages,
+    estimate_tokens,
+)
+from backend.llm.latency import within_budget
+from backend.llm.ratelimit import rate_limiter
+from backend.llm.retry import RetryPolicy
+from backend.llm.usage import record_call
+
+
+def _cache_hint(system_prompt: str) -> dict:
+    """Route requests sharing a system prompt to the same prompt-cache shard.
+
+    OpenAI caches identical prefixes automatically; keeping the static system
+    prompt as the first message and tagging it with a stable key raises the
+    hit rate across concurrent requests.
+    """
+    return {"prompt_cache_key": hashlib.sha256(system_prompt.encode()).hexdigest()[:32]}
+
+
+def _usage(usage) -> dict[str, int]:
+    if not usage:
+        return {"input_tokens": 0, "output_tokens": 0, "cache_read_input_tokens": 0}
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    # Report uncached input separately, matching Anthropic's accounting
+    return {
+        "input_tokens": usage.prompt_tokens - cached,
+        "output_tokens": usage.completion_tokens,
+        "cache_read_input_tokens": cached,
+    }
+
+
+def _response_format(response_schema: dict | None) -> dict:
+    """Constrain output to the schema when given, otherwise to any JSON object."""
+    if response_schema is None:
+        return {"type": "json_object"}
+    return {
+        "type": "json_schema",
+        # Non-strict: strict mode rejects optional fields, which our models use
+        "json_schema": {"name": "response", "schema": response_schema, "strict": False},
+    }
 
 
 class OpenAIProvider(LLMProvider):
     def __init__(self, model: str | None = None, api_key: str | None = None):
-        self.client = AsyncOpenAI(api_key=api_key or settings.openai_api_key)
+        self.client = AsyncOpenAI(
+            api_key=api_key or settings.openai_api_key,
+            http_client=DefaultAsyncHttpxClient(http2=HTTP2_AVAILABLE),
+            max_retries=0,  # Retries are handled by self.retry_policy
+        )
         self.model = model or settings.default_openai_model
+        self.retry_policy = RetryPolicy.from_settings()
+
+    def _params(self, system_prompt: str, user_message: str | Messages, **params) -> dict:
+        return {
+            "model": self.model,
+            "extra_body": _cache_hint(system_prompt),
+            # OpenAI caches matching prompt prefixes automatically
+            "messages": [{"role": "system", "content": system_prompt}, *as_messages(user_message)],
+            **params,
+        }
+
+    async def _create(self, system_prompt: str, user_message: str | Messages, **params):
+        """chat.completions.create with rate limiting, retries and usage accounting."""
+        limiter = rate_limiter("openai", self.model)
+        tokens = estimate_tokens(system_prompt, user_message)
+        attempts = 0
+
+        async def attempt():
+            nonlocal attempts
+            attempts += 1
+            async with limiter.slot(tokens):
+                return await within_budget(self.client.chat.completions.create(
+                    **self._params(system_prompt, user_message, **params)
+                ))
+
+        start = time.monotonic()
+        resp = await self.retry_policy.run(attempt)
+        record_call("openai", self.model, _usage(resp.usage), time.monotonic() - start, attempts - 1)
+        return resp
+
+    async def _stream(self, system_prompt: str, user_message: str | Messages, **params) -> AsyncIterator[str]:
+        """Streaming counterpart of `_create`, yielding content deltas.
+
+        Raises TruncatedResponseError after the last chunk if output hit max_tokens.
+        """
+        limiter = rate_limiter("openai", self.model)
+        tokens = estimate_tokens(system_prompt, user_message)
+        attempts = 0
+        usage = None
+        finish_reason = None
+
+        async def attempt():
+            nonlocal attempts, usage, finish_reason
+            attempts += 1
+            async with limiter.slot(tokens):
+                stream = await self.client.chat.completions.create(
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **self._params(system_prompt, user_message, **params),
+                )
+                async for chunk in stream:
+                    if chunk.usage:
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    finish_reason = chunk.choices[0].finish_reason or finish_reason
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+
+        start = time.monotonic()
+        chunks = []
+        async for text in self.retry_policy.stream(attempt):
+            chunks.append(text)
+            yield text
+        record_call("openai", self.model, _usage(usage), time.monotonic() - start, attempts - 1)
+        if finish_reason == "length":
+            raise TruncatedResponseError("".join(chunks))
 
     async def complete(
         self,
         system_prompt: str,
-        user_message: str,
+        user_message: str | Messages,
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> LLMResponse:
-        resp = await self.client.chat.completions.create(
-            model=self.model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message},
-            ],
+        resp = await self._create(
+            system_prompt, user_message, max_tokens=max_tokens, temperature=temperature
         )
         return LLMResponse(
             content=resp.choices[0].message.content or "",
             model=self.model,
-            usage={
-                "input_tokens": resp.usage.prompt_tokens if resp.usage else 0,
-                "output_tokens": resp.usage.completion_tokens if resp.usage else 0,
-            },
+            usage=_usage(resp.usage),
+            truncated=resp.choices[0].finish_reason == "length",
         )
 
     async def complete_json(
         self,
         system_prompt: str,
-        user_message: str,
+        user_message: str | Messages,
         response_schema: dict | None = None,
         max_tokens: int = 4096,
     ) -> dict:
-        resp = await self.client.chat.completions.create(
-            model=self.model,
+        resp = await self._create(
+            system_prompt + "\nRespond with valid JSON.",
+            user_message,
             max_tokens=max_tokens,
             temperature=0.2,
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": system_prompt + "\nRespond with valid JSON."},
-                {"role": "user", "content": user_message},
-            ],
+            response_format=_response_format(response_schema),
         )
-        return json.loads(resp.choices[0].message.content or "{}")
+        content = resp.choices[0].message.content or "{}"
+        if resp.choices[0].finish_reason == "length":
+            raise TruncatedResponseError(content)
+        return json.loads(content)
+
+    async def stream(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        try:
+            async for text in self._stream(
+                system_prompt, user_message, max_tokens=max_tokens, temperature=temperature
+            ):
+                yield text
+        except TruncatedResponseError:
+            return  # A cut-off text reply is still worth showing
+
+    async def stream_json(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        response_schema: dict | None = None,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        async for text in self._stream(
+            system_prompt + "\nRespond with valid JSON.",
+            user_message,
+            max_tokens=max_tokens,
+            temperature=0.2,
+            response_format=_response_format(response_schema),
+        ):
+            yield text
+
+    async def warm_up(self) -> None:
+        # Cheapest authenticated request — only here to complete the TLS handshake
+        try:
+            await self.client.models.list()
+        except Exception:
+            pass
+
+    async def aclose(self) -> None:
+        await self.client.close()
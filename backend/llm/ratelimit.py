@@ -0,0 +1,83 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from backend.config import settings
+from backend.llm.latency import active_budget
+
+
+class RateLimiter:
+    """Requests/min and input-tokens/min token buckets plus an in-flight cap.
+
+    Callers wait rather than fail, and are admitted strictly in arrival order
+    so a large request can't be starved by a stream of small ones.
+    """
+
+    def __init__(self, rpm: int, input_tpm: int, max_in_flight: int):
+        self.rpm = rpm
+        self.input_tpm = input_tpm
+        self._requests = float(rpm)
+        self._tokens = float(input_tpm)
+        self._updated = time.monotonic()
+        self._queue = asyncio.Lock()  # Wakes waiters in FIFO order
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.input_tpm, self._tokens + elapsed * self.input_tpm / 60)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int) -> AsyncIterator[None]:
+        """Hold a request slot for the duration of one provider call."""
+        # A request larger than the whole bucket would wait forever; cap its cost
+        cost = min(estimated_tokens, self.input_tpm)
+        budget = active_budget()
+        if budget is not None:
+            budget.queued = True
+        acquired = False
+        try:
+            async with self._queue:
+                await self._in_flight.acquire()
+                acquired = True
+                while True:
+                    self._refill()
+                    if self._requests >= 1 and self._tokens >= cost:
+                        self._requests -= 1
+                        self._tokens -= cost
+                        break
+                    wait = max(
+                        (1 - self._requests) * 60 / self.rpm,
+                        (cost - self._tokens) * 60 / self.input_tpm,
+                    )
+                    await asyncio.sleep(wait)
+            if budget is not None:
+                budget.queued = False  # Stays set if cancelled while waiting
+            yield
+        finally:
+            # Also runs when cancelled while waiting for the buckets
+            if acquired:
+                self._in_flight.release()
+
+
+_limiters: dict[tuple[str, str], RateLimiter] = {}
+
+
+def rate_limiter(vendor: str, model: str) -> RateLimiter:
+    """Return the process-wide limiter for a vendor's model.
+
+    Limits come from `settings.llm_rate_limits[vendor]`, falling back to the
+    "default" entry.
+    """
+    key = (vendor, model)
+    if key not in _limiters:
+        limits = settings.llm_rate_limits.get(vendor, settings.llm_rate_limits["default"])
+        _limiters[key] = RateLimiter(
+            rpm=limits["rpm"],
+            input_tpm=limits["input_tpm"],
+            max_in_flight=limits["max_in_flight"],
+        )
+    return _limiters[key]
@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from collections.abc import AsyncIterator
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from backend.config import settings
+from backend.llm.base import LLMProvider, LLMResponse, Messages, TruncatedResponseError
+from backend.llm.usage import capture_calls, record_call
+
+LATENCY_MODES = ("none", "recorded", "sampled")
+
+
+class CassetteMissError(LookupError):
+    """Replay was asked for a request that was never recorded."""
+
+
+class Cassette:
+    """Recorded LLM interactions for one task type, one JSON object per line.
+
+    Entries are matched on the request content, not the provider, so a
+    cassette recorded against Claude replays the same under any model
+    config. A request recorded several times replays its responses in
+    recording order, repeating the last one.
+
+    Prompts embed today's date, so a request with no exact match falls back
+    to the recordings with the same kind and system prompt, in order.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.entries: dict[str, list[dict]] = {}
+        self._served: dict[str, int] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            for line in self.path.read_text().splitlines():
+                if line.strip():
+                    self._index(json.loads(line))
+
+    def _index(self, entry: dict):
+        self.entries.setdefault(entry["key"], []).append(entry)
+        self.entries.setdefault(entry["loose_key"], []).append(entry)
+
+    @staticmethod
+    def make_key(**request: Any) -> str:
+        payload = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def add(self, entry: dict):
+        with self._lock:
+            self._index(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+    def next(self, key: str, loose_key: str) -> dict:
+        with self._lock:
+            if key not in self.entries:
+                key = loose_key
+            recorded = self.entries.get(key)
+            if not recorded:
+                raise CassetteMissError(f"No recorded response in {self.path} for request {key[:12]}")
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            return recorded[min(served, len(recorded) - 1)]
+
+    def latencies(self, kind: str) -> list[float]:
+        """Every recorded latency for one kind of call, the distribution for sampling."""
+        return [
+            e["latency_s"] for key, entries in self.entries.items()
+            for e in entries if e["key"] == key and e["kind"] == kind
+        ]
+
+
+_cassettes: dict[str, Cassette] = {}
+
+
+def get_cassette(task_type: str) -> Cassette:
+    """Return the cassette for a task type under `llm_cassette_dir`, loading it once."""
+    path = str(Path(settings.llm_cassette_dir) / f"{task_type}.jsonl")
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path)
+    return _cassettes[path]
+
+
+def _request(kind: str, **request: Any) -> tuple[str, str, dict]:
+    """Exact key, loose (kind + system prompt) key, and the request body."""
+    return (
+        Cassette.make_key(kind=kind, **request),
+        Cassette.make_key(kind=kind, system=request["system"]),
+        request,
+    )
+
+
+class RecordingProvider(LLMProvider):
+    """Passes calls through to `inner` and records each completed exchange.
+
+    Alongside the response it stores the measured latency (and time to first
+    chunk for streams) and the per-call usage the providers reported.
+    """
+
+    def __init__(self, inner: LLMProvider, task_type: str, cassette: Cassette | None = None):
+        self.inner = inner
+        self.task_type = task_type
+        self.cassette = cassette or get_cassette(task_type)
+
+    @property
+    def identity(self) -> str:
+        return self.inner.identity
+
+    def _save(
+        self, kind: str, request: tuple[str, str, dict], calls: list, latency_s: float, **response: Any
+    ):
+        key, loose_key, body = request
+        self.cassette.add({
+            "key": key,
+            "loose_key": loose_key,
+            "kind": kind,
+            "request": body,
+            "provider": self.identity,
+            "calls": [{"model": c.model, "usage": {
+                "input_tokens": c.input_tokens,
+                "output_tokens": c.output_tokens,
+                "cache_read_input_tokens": c.cache_read_input_tokens,
+                "cache_creation_input_tokens": c.cache_creation_input_tokens,
+            }} for c in calls],
+            "latency_s": round(latency_s, 3),
+            **response,
+        })
+
+    async def complete(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> LLMResponse:
+        request = _request(
+            "text", system=system_prompt, user=user_message,
+            temperature=temperature, max_tokens=max_tokens,
+        )
+        start = time.monotonic()
+        with capture_calls() as calls:
+            resp = await self.inner.complete(system_prompt, user_message, temperature, max_tokens)
+        self._save("text", request, calls, time.monotonic() - start, response=asdict(resp))
+        return resp
+
+    async def complete_json(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        response_schema: dict | None = None,
+        max_tokens: int = 4096,
+    ) -> dict:
+        request = _request(
+            "json", system=system_prompt, user=user_message,
+            schema=response_schema, max_tokens=max_tokens,
+        )
+        start = time.monotonic()
+        with capture_calls() as calls:
+            try:
+                data = await self.inner.complete_json(
+                    system_prompt, user_message, response_schema, max_tokens=max_tokens
+                )
+            except TruncatedResponseError as e:
+                self._save("json", request, calls, time.monotonic() - start, truncated=e.partial)
+                raise
+        self._save("json", request, calls, time.monotonic() - start, response=data)
+        return data
+
+    async def _record_stream(
+        self, kind: str, request: tuple[str, str, dict], chunks_in: AsyncIterator[str]
+    ) -> AsyncIterator[str]:
+        start = time.monotonic()
+        first_chunk_s = None
+        chunks = []
+        with capture_calls() as calls:
+            try:
+                async for chunk in chunks_in:
+                    if first_chunk_s is None:
+                        first_chunk_s = time.monotonic() - start
+                    chunks.append(chunk)
+                    yield chunk
+            except TruncatedResponseError:
+                self._save(
+                    kind, request, calls, time.monotonic() - start,
+                    chunks=chunks, first_chunk_s=first_chunk_s, truncated="".join(chunks),
+                )
+                raise
+        self._save(
+            kind, request, calls, time.monotonic() - start,
+            chunks=chunks, first_chunk_s=first_chunk_s,
+        )
+
+    async def stream(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        request = _request(
+            "text_stream", system=system_prompt, user=user_message,
+            temperature=temperature, max_tokens=max_tokens,
+        )
+        async for chunk in self._record_stream(
+            "text_stream", request,
+            self.inner.stream(system_prompt, user_message, temperature, max_tokens),
+        ):
+            yield chunk
+
+    async def stream_json(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        response_schema: dict | None = None,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        request = _request(
+            "json_stream", system=system_prompt, user=user_message,
+            schema=response_schema, max_tokens=max_tokens,
+        )
+        async for chunk in self._record_stream(
+            "json_stream", request,
+            self.inner.stream_json(system_prompt, user_message, response_schema, max_tokens=max_tokens),
+        ):
+            yield chunk
+
+    async def warm_up(self) -> None:
+        await self.inner.warm_up()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayProvider(LLMProvider):
+    """Serves recorded exchanges offline, without API keys or network.
+
+    `latency` controls the simulated wait: "none" replies at once, "recorded"
+    waits as long as the original call took, and "sampled" draws a latency
+    from every recorded call of the same kind. Recorded usage is re-reported
+    so usage and cost reports look like the original run.
+    """
+
+    def __init__(self, task_type: str, cassette: Cassette | None = None, latency: str | None = None):
+        self.task_type = task_type
+        self.cassette = cassette or get_cassette(task_type)
+        self.latency = latency or settings.llm_replay_latency
+        if self.latency not in LATENCY_MODES:
+            raise ValueError(f"llm_replay_latency must be one of {LATENCY_MODES}, got {self.latency!r}")
+
+    @property
+    def identity(self) -> str:
+        return f"ReplayProvider:{self.cassette.path.name}"
+
+    def _latency_s(self, entry: dict) -> float:
+        if self.latency == "recorded":
+            return entry["latency_s"]
+        if self.latency == "sampled":
+            return random.choice(self.cassette.latencies(entry["kind"]))
+        return 0.0
+
+    def _report(self, entry: dict, latency_s: float):
+        for call in entry["calls"]:
+            record_call("replay", call["model"], call["usage"], latency_s / len(entry["calls"]))
+
+    async def _play(self, kind: str, **request: Any) -> dict:
+        key, loose_key, _ = _request(kind, **request)
+        entry = self.cassette.next(key, loose_key)
+        latency_s = self._latency_s(entry)
+        await asyncio.sleep(latency_s)
+        self._report(entry, latency_s)
+        if "truncated" in entry and kind == "json":
+            raise TruncatedResponseError(entry["truncated"])
+        return entry
+
+    async def complete(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> LLMResponse:
+        entry = await self._play(
+            "text", system=system_prompt, user=user_message,
+            temperature=temperature, max_tokens=max_tokens,
+        )
+        return LLMResponse(**entry["response"])
+
+    async def complete_json(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        response_schema: dict | None = None,
+        max_tokens: int = 4096,
+    ) -> dict:
+        entry = await self._play(
+            "json", system=system_prompt, user=user_message,
+            schema=response_schema, max_tokens=max_tokens,
+        )
+        return entry["response"]
+
+    async def _play_stream(self, kind: str, **request: Any) -> AsyncIterator[str]:
+        key, loose_key, _ = _request(kind, **request)
+        entry = self.cassette.next(key, loose_key)
+        latency_s = self._latency_s(entry)
+        chunks = entry["chunks"]
+        # Keep the recorded shape: a wait for the first chunk, the rest spread evenly
+        recorded_s = entry["latency_s"] or 1.0
+        first_s = latency_s * (entry.get("first_chunk_s") or 0.0) / recorded_s
+        gap_s = (latency_s - first_s) / max(len(chunks) - 1, 1)
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(first_s if i == 0 else gap_s)
+            yield chunk
+        self._report(entry, latency_s)
+        if "truncated" in entry:
+            raise TruncatedResponseError(entry["truncated"])
+
+    async def stream(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        async for chunk in self._play_stream(
+            "text_stream", system=system_prompt, user=user_message,
+            temperature=temperature, max_tokens=max_tokens,
+        ):
+            yield chunk
+
+    async def stream_json(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        response_schema: dict | None = None,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        async for chunk in self._play_stream(
+            "json_stream", system=system_prompt, user=user_message,
+            schema=response_schema, max_tokens=max_tokens,
+        ):
+            yield chunk
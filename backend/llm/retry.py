@@ -0,0 +1,138 @@
+import asyncio
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import TypeVar
+
+import anthropic
+import openai
+
+from backend.config import settings
+from backend.llm.latency import LatencyBudgetError
+
+T = TypeVar("T")
+
+# 408 timeout, 409 conflict, 429 rate limited, 5xx server errors, 529 overloaded
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+_CONNECTION_ERRORS = (anthropic.APIConnectionError, openai.APIConnectionError, asyncio.TimeoutError)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient failures worth retrying on the same provider."""
+    if isinstance(exc, LatencyBudgetError):
+        return False  # A slow provider is left for the next one
+    if isinstance(exc, _CONNECTION_ERRORS):
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    """Server-requested wait from Retry-After / retry-after-ms headers, if any."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Bounded retries with full-jitter exponential backoff and a per-call deadline."""
+    max_attempts: int
+    base_delay_s: float
+    max_delay_s: float
+    deadline_s: float | None
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        return cls(
+            max_attempts=settings.llm_retry_max_attempts,
+            base_delay_s=settings.llm_retry_base_delay_s,
+            max_delay_s=settings.llm_retry_max_delay_s,
+            deadline_s=settings.llm_call_deadline_s,
+        )
+
+    def delay(self, attempt: int, exc: BaseException) -> float:
+        server_wait = retry_after_seconds(exc)
+        if server_wait is not None:
+            return server_wait
+        return random.uniform(0, min(self.max_delay_s, self.base_delay_s * 2 ** attempt))
+
+    def _remaining(self, start: float) -> float | None:
+        if self.deadline_s is None:
+            return None
+        return self.deadline_s - (time.monotonic() - start)
+
+    def _next_wait(self, attempt: int, exc: BaseException, start: float) -> float:
+        """Seconds to sleep before the next attempt, or re-raise if out of budget."""
+        if attempt + 1 >= self.max_attempts or not is_retryable(exc):
+            raise exc
+        wait = self.delay(attempt, exc)
+        remaining = self._remaining(start)
+        if remaining is not None and wait >= remaining:
+            # Waiting would blow the deadline — let the caller fail over instead
+            raise exc
+        return wait
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Await a fresh `call()` until one succeeds or the policy gives up."""
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = self._remaining(start)
+            try:
+                if remaining is None:
+                    return await call()
+                return await asyncio.wait_for(call(), timeout=remaining)
+            except Exception as e:
+                await asyncio.sleep(self._next_wait(attempt, e, start))
+                attempt += 1
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Iterate a fresh `open_stream()`, retrying only failures before the first item.
+
+        Once something has been yielded it can't be taken back, so later
+        errors propagate. The deadline bounds the wait for the first item.
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            iterator = open_stream().__aiter__()
+            remaining = self._remaining(start)
+            try:
+                if remaining is None:
+                    first = await iterator.__anext__()
+                else:
+                    first = await asyncio.wait_for(iterator.__anext__(), timeout=remaining)
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                await iterator.aclose()
+                await asyncio.sleep(self._next_wait(attempt, e, start))
+                attempt += 1
+                continue
+            break
+
+        try:
+            yield first
+            async for item in iterator:
+                yield item
+        finally:
+            await iterator.aclose()
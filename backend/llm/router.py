@@ -1,75 +1,325 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
 from backend.config import settings
-from backend.llm.base import LLMProvider, LLMResponse
+from backend.llm.base import LLMProvider, LLMResponse, Messages, TruncatedResponseError
 from backend.llm.anthropic import ClaudeProvider
+from backend.llm.cache import CachedProvider
+from backend.llm.health import health_snapshot, provider_health
+from backend.llm.latency import attempt_budget, latency_tracker
+from backend.llm.usage import fallback_hop
 from backend.llm.openai import OpenAIProvider
+from backend.llm.replay import RecordingProvider, ReplayProvider
 
 # Maps task types to preferred LLM providers (in priority order)
 TASK_MODEL_MAP: dict[str, list[str]] = {
+    "classify": ["claude", "openai"],
+    "gather": ["claude", "openai"],
     "planning": ["claude", "openai"],
     "research": ["openai", "claude"],
     "writing": ["claude", "openai"],
     "default": ["claude", "openai"],
 }
 
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """Which model each vendor runs for a task type, and the limits it runs under."""
+    models: dict[str, str]
+    max_tokens: int
+    latency_budget_s: float | None
+
+
+def model_tier(task_type: str) -> ModelTier:
+    """Resolve a task type's tier from `settings.llm_task_tiers`."""
+    tiers = settings.llm_task_tiers
+    tier = tiers.get(task_type, tiers.get("default", {}))
+    return ModelTier(
+        models={
+            "claude": str(tier.get("claude") or settings.default_claude_model),
+            "openai": str(tier.get("openai") or settings.default_openai_model),
+        },
+        max_tokens=int(tier.get("max_tokens", 16384)),
+        latency_budget_s=tier.get("latency_budget_s"),
+    )
+
+
+async def _first_chunk_within(chunks: AsyncIterator[str], budget_s: float | None) -> AsyncIterator[str]:
+    """Re-yield `chunks`, failing if the first one takes longer than budget_s."""
+    iterator = chunks.__aiter__()
+    try:
+        try:
+            first = await asyncio.wait_for(iterator.__anext__(), budget_s)
+        except StopAsyncIteration:
+            return
+        yield first
+        async for chunk in iterator:
+            yield chunk
+    finally:
+        await iterator.aclose()
+
 
 class FallbackProvider(LLMProvider):
-    """Tries the primary provider, falls back to secondary on failure."""
+    """Tries the primary provider, falls back to secondary on failure.
+
+    Providers whose circuit is open (see `backend.llm.health`) are moved to
+    the back of the order until their cooldown ends.
+
+    A reply cut off at max_tokens is raised straight to the caller: the next
+    provider would run into the same limit.
+
+    With hedging on, a request that outlasts the primary's usual latency
+    (`llm_hedge_percentile` of its recent calls for this task type) is also
+    sent to the next provider; the first success wins and the rest are cancelled.
 
-    def __init__(self, providers: list[LLMProvider]):
+    `max_tokens` caps what callers may request, and a provider that misses
+    `latency_budget_s` counts as failed. The budget applies to each request
+    once it has its rate-limit slot (for streams: to the first chunk), and a
+    call that runs out of time while still queued behind our own limiter
+    is not held against the provider.
+    """
+
+    def __init__(
+        self,
+        providers: list[LLMProvider],
+        task_type: str = "default",
+        hedge: bool | None = None,
+        max_tokens: int | None = None,
+        latency_budget_s: float | None = None,
+    ):
         self.providers = providers
+        self.task_type = task_type
+        self.hedge = settings.llm_hedging_enabled if hedge is None else hedge
+        self.max_tokens = max_tokens
+        self.latency_budget_s = latency_budget_s
+
+    def _cap(self, max_tokens: int) -> int:
+        return min(max_tokens, self.max_tokens) if self.max_tokens else max_tokens
+
+    @property
+    def identity(self) -> str:
+        return "|".join(p.identity for p in self.providers)
 
     async def complete(
         self,
         system_prompt: str,
-        user_message: str,
+        user_message: str | Messages,
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> LLMResponse:
+        max_tokens = self._cap(max_tokens)
+        return await self._call(
+            lambda p: p.complete(system_prompt, user_message, temperature, max_tokens)
+        )
+
+    async def complete_json(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        response_schema: dict | None = None,
+        max_tokens: int = 4096,
+    ) -> dict:
+        max_tokens = self._cap(max_tokens)
+        return await self._call(
+            lambda p: p.complete_json(
+                system_prompt, user_message, response_schema, max_tokens=max_tokens
+            )
+        )
+
+    def _ordered(self) -> list[LLMProvider]:
+        """Providers in preference order, with open circuits demoted to last resort."""
+        healthy = [p for p in self.providers if not provider_health(p.identity).is_open()]
+        return healthy + [p for p in self.providers if p not in healthy]
+
+    async def _timed(
+        self, provider: LLMProvider, call: Callable[[LLMProvider], Awaitable[T]], hop: int
+    ) -> T:
+        health = provider_health(provider.identity)
+        start = time.monotonic()
+        try:
+            with fallback_hop(hop), attempt_budget(self.latency_budget_s) as budget:
+                result = await call(provider)
+        except TruncatedResponseError:
+            health.record_success()  # The provider answered, just at length
+            raise
+        except Exception as e:
+            if budget.blames(e):
+                health.record_failure(e)
+            raise
+        latency_tracker(provider.identity, self.task_type).record(time.monotonic() - start)
+        health.record_success()
+        return result
+
+    def _hedge_delay(self, provider: LLMProvider) -> float:
+        """Seconds to wait on `provider` before also asking the next one."""
+        tracker = latency_tracker(provider.identity, self.task_type)
+        if len(tracker.samples) < settings.llm_hedge_min_samples:
+            return settings.llm_hedge_default_delay_s
+        return tracker.percentile(settings.llm_hedge_percentile)
+
+    async def _call(self, call: Callable[[LLMProvider], Awaitable[T]]) -> T:
+        if not self.hedge:
+            last_err = None
+            for hop, provider in enumerate(self._ordered()):
+                try:
+                    return await self._timed(provider, call, hop)
+                except TruncatedResponseError:
+                    raise
+                except Exception as e:
+                    last_err = e
+                    continue
+            raise last_err or RuntimeError("All LLM providers failed")
+
+        waiting = self._ordered()
+        running: dict[asyncio.Task, LLMProvider] = {}
         last_err = None
-        for provider in self.providers:
-            try:
-                return await provider.complete(
-                    system_prompt, user_message, temperature, max_tokens
+
+        def launch():
+            hop = len(self.providers) - len(waiting)
+            provider = waiting.pop(0)
+            running[asyncio.create_task(self._timed(provider, call, hop))] = provider
+
+        launch()
+        try:
+            while running:
+                latest = list(running.values())[-1]
+                delay = self._hedge_delay(latest) if waiting else None
+                done, _ = await asyncio.wait(
+                    running, timeout=delay, return_when=asyncio.FIRST_COMPLETED
                 )
+                if not done:
+                    launch()  # Primary is in its tail — hedge on the next provider
+                    continue
+                for task in done:
+                    del running[task]
+                    err = task.exception()
+                    if err is None or isinstance(err, TruncatedResponseError):
+                        return task.result()  # Raises the truncation as-is
+                    last_err = err
+                if not running and waiting:
+                    launch()
+            raise last_err or RuntimeError("All LLM providers failed")
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def stream(
+        self,
+        system_prompt: str,
+        user_message: str | Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> AsyncIterator[str]:
+        # Fall back only while nothing has been yielded — text already shown
+        # to the caller can't be taken back.
+        last_err = None
+        max_tokens = self._cap(max_tokens)
+        for hop, provider in enumerate(self._ordered()):
+            health = provider_health(provider.identity)
+            started = False
+            try:
+                with fallback_hop(hop), attempt_budget(None) as budget:
+                    async for chunk in _first_chunk_within(
+                        provider.stream(system_prompt, user_message, temperature, max_tokens),
+                        self.latency_budget_s,
+                    ):
+                        started = True
+                        yield chunk
             except Exception as e:
+                if budget.blames(e):
+                    health.record_failure(e)
+                if started:
+                    raise
                 last_err = e
                 continue
+            health.record_success()
+            return
         raise last_err or RuntimeError("All LLM providers failed")
 
-    async def complete_json(
+    async def stream_json(
         self,
         system_prompt: str,
-        user_message: str,
+        user_message: str | Messages,
         response_schema: dict | None = None,
         max_tokens: int = 4096,
-    ) -> dict:
+    ) -> AsyncIterator[str]:
         last_err = None
-        for provider in self.providers:
+        max_tokens = self._cap(max_tokens)
+        for hop, provider in enumerate(self._ordered()):
+            health = provider_health(provider.identity)
+            started = False
             try:
-                return await provider.complete_json(
-                    system_prompt, user_message, response_schema, max_tokens=max_tokens
-                )
+                with fallback_hop(hop), attempt_budget(None) as budget:
+                    async for chunk in _first_chunk_within(
+                        provider.stream_json(
+                            system_prompt, user_message, response_schema, max_tokens=max_tokens
+                        ),
+                        self.latency_budget_s,
+                    ):
+                        started = True
+                        yield chunk
+            except TruncatedResponseError:
+                health.record_success()
+                raise
             except Exception as e:
+                if budget.blames(e):
+                    health.record_failure(e)
+                if started:
+                    raise
                 last_err = e
                 continue
+            health.record_success()
+            return
         raise last_err or RuntimeError("All LLM providers failed")
 
 
-def _build_provider(name: str) -> LLMProvider | None:
+# Process-wide provider pool. Each vendor client owns an HTTP connection pool,
+# so providers are built once per (vendor, model) and reused by every task type.
+_PROVIDERS: dict[tuple[str, str], LLMProvider] = {}
+_TASK_PROVIDERS: dict[str, LLMProvider] = {}
+
+
+def _build_provider(name: str, model: str) -> LLMProvider | None:
     if name == "claude" and settings.anthropic_api_key:
-        return ClaudeProvider()
+        key = (name, model)
+        if key not in _PROVIDERS:
+            _PROVIDERS[key] = ClaudeProvider(model=key[1])
+        return _PROVIDERS[key]
     if name == "openai" and settings.openai_api_key:
-        return OpenAIProvider()
+        key = (name, model)
+        if key not in _PROVIDERS:
+            _PROVIDERS[key] = OpenAIProvider(model=key[1])
+        return _PROVIDERS[key]
     return None
 
 
 def get_provider(task_type: str = "default") -> LLMProvider:
-    """Get an LLM provider with automatic fallback for a given task type."""
+    """Get an LLM provider with automatic fallback for a given task type.
+
+    Providers are pooled for the life of the process; call `close_providers()`
+    from the event loop that used them before it shuts down.
+
+    `llm_cassette_mode` switches to recording every exchange, or to replaying
+    recorded ones with no API keys or network needed.
+    """
+    if task_type in _TASK_PROVIDERS:
+        return _TASK_PROVIDERS[task_type]
+
+    if settings.llm_cassette_mode == "replay":
+        _TASK_PROVIDERS[task_type] = ReplayProvider(task_type)
+        return _TASK_PROVIDERS[task_type]
+
     preferences = TASK_MODEL_MAP.get(task_type, TASK_MODEL_MAP["default"])
+    tier = model_tier(task_type)
 
     providers = []
     for name in preferences:
-        p = _build_provider(name)
+        p = _build_provider(name, tier.models[name])
         if p:
             providers.append(p)
 
@@ -78,8 +328,48 @@ def get_provider(task_type: str = "default") -> LLMProvider:
             "No LLM API key configured. Set ANTHROPIC_API_KEY or OPENAI_API_KEY in .env"
         )
 
-    # If only one provider available, return it directly (no wrapper overhead)
-    if len(providers) == 1:
-        return providers[0]
+    # Wrapped even with a single provider, to enforce the tier's limits
+    provider = FallbackProvider(
+        providers, task_type,
+        max_tokens=tier.max_tokens, latency_budget_s=tier.latency_budget_s,
+    )
+    if settings.llm_cassette_mode == "record":
+        # Not cached: a cassette should hold real provider calls and latencies
+        provider = RecordingProvider(provider, task_type)
+    elif settings.llm_cache_enabled:
+        provider = CachedProvider(provider, task_type)
+    _TASK_PROVIDERS[task_type] = provider
+    return provider
+
+
+def routing_snapshot() -> dict[str, dict]:
+    """Effective provider order per task type plus circuit state, for monitoring."""
+    order = {}
+    for task_type, provider in _TASK_PROVIDERS.items():
+        if isinstance(provider, (CachedProvider, RecordingProvider)):
+            provider = provider.inner
+        if isinstance(provider, FallbackProvider):
+            order[task_type] = [p.identity for p in provider._ordered()]
+        else:
+            order[task_type] = [provider.identity]
+    return {"task_order": order, "providers": health_snapshot()}
+
+
+async def warm_up_providers(task_types: list[str] | None = None) -> None:
+    """Pre-open connections for the providers the given task types will use."""
+    for task_type in task_types or list(TASK_MODEL_MAP):
+        try:
+            get_provider(task_type)
+        except RuntimeError:
+            return
+    await asyncio.gather(
+        *(p.warm_up() for p in _PROVIDERS.values()), return_exceptions=True
+    )
+
 
-    return FallbackProvider(providers)
+async def close_providers() -> None:
+    """Close every pooled provider client and empty the pool."""
+    providers = list(_PROVIDERS.values())
+    _PROVIDERS.clear()
+    _TASK_PROVIDERS.clear()
+    await asyncio.gather(*(p.aclose() for p in providers), return_exceptions=True)
@@ -0,0 +1,53 @@
+from typing import Any, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+
+# Providers require an object at the top level, so lists are wrapped in this key
+LIST_KEY = "items"
+
+
+def json_schema_for(model: type[BaseModel], many: bool = False) -> dict[str, Any]:
+    """JSON schema for one `model` object, or an {"items": [model, ...]} wrapper."""
+    schema = model.model_json_schema()
+    if not many:
+        return schema
+    defs = schema.pop("$defs", {})
+    wrapped: dict[str, Any] = {
+        "type": "object",
+        "properties": {LIST_KEY: {"type": "array", "items": schema}},
+        "required": [LIST_KEY],
+    }
+    if defs:
+        wrapped["$defs"] = defs
+    return wrapped
+
+
+def parse_structured(data: Any, model: type[M], many: bool = False) -> M | list[M]:
+    """Validate a provider's JSON into `model` instances.
+
+    Lists are accepted bare, under LIST_KEY, or under any other single list
+    value (e.g. {"hotels": [...]}) for providers that ignored the schema.
+    Invalid list items are dropped so one bad item doesn't sink the rest.
+    """
+    if not many:
+        return model.model_validate(data)
+    if isinstance(data, dict):
+        items = data.get(LIST_KEY)
+        if items is None:
+            items = next((v for v in data.values() if isinstance(v, list)), [])
+    else:
+        items = data
+    return validate_items(items, model)
+
+
+def validate_items(items: list, model: type[M]) -> list[M]:
+    """Validate each item into `model`, skipping the ones that don't fit."""
+    valid = []
+    for item in items:
+        try:
+            valid.append(model.model_validate(item))
+        except ValidationError:
+            continue
+    return valid
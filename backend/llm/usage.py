@@ -0,0 +1,185 @@
+import contextvars
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+# USD per million tokens: (input, output, cache read). Matched by model-name prefix.
+# Anthropic cache writes bill at 1.25x input.
+MODEL_PRICES: dict[str, tuple[float, float, float]] = {
+    "claude-opus-4": (15.0, 75.0, 1.5),
+    "claude-sonnet-4": (3.0, 15.0, 0.3),
+    "claude-3-7-sonnet": (3.0, 15.0, 0.3),
+    "claude-3-5-sonnet": (3.0, 15.0, 0.3),
+    "claude-haiku-4": (1.0, 5.0, 0.1),
+    "claude-3-5-haiku": (0.8, 4.0, 0.08),
+    "gpt-4o-mini": (0.15, 0.6, 0.075),
+    "gpt-4o": (2.5, 10.0, 1.25),
+    "gpt-4.1-nano": (0.1, 0.4, 0.025),
+    "gpt-4.1-mini": (0.4, 1.6, 0.1),
+    "gpt-4.1": (2.0, 8.0, 0.5),
+}
+CACHE_WRITE_MULTIPLIER = 1.25
+
+
+def estimate_cost_usd(model: str, usage: dict[str, int]) -> float:
+    """Dollar cost of one call, or 0.0 for models missing from MODEL_PRICES."""
+    prices = next(
+        (p for prefix, p in sorted(MODEL_PRICES.items(), key=lambda kv: -len(kv[0]))
+         if model.startswith(prefix)),
+        None,
+    )
+    if prices is None:
+        return 0.0
+    input_price, output_price, cache_read_price = prices
+    return (
+        usage.get("input_tokens", 0) * input_price
+        + usage.get("output_tokens", 0) * output_price
+        + usage.get("cache_read_input_tokens", 0) * cache_read_price
+        + usage.get("cache_creation_input_tokens", 0) * input_price * CACHE_WRITE_MULTIPLIER
+    ) / 1_000_000
+
+
+@dataclass
+class CallRecord:
+    """One provider round trip (or cache hit) and what it cost."""
+    provider: str
+    model: str
+    task_type: str
+    phase: str
+    agent: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    latency_s: float = 0.0
+    retries: int = 0
+    fallback_hops: int = 0
+    cache_hit: bool = False
+    cost_usd: float = 0.0
+
+
+@dataclass
+class UsageReport:
+    """Every LLM call made during one orchestrator run."""
+    records: list[CallRecord] = field(default_factory=list)
+
+    def _group(self, attr: str) -> dict[str, dict]:
+        groups: dict[str, dict] = {}
+        for r in self.records:
+            g = groups.setdefault(getattr(r, attr), {
+                "calls": 0, "input_tokens": 0, "output_tokens": 0,
+                "cached_tokens": 0, "latency_s": 0.0, "cost_usd": 0.0,
+            })
+            g["calls"] += 1
+            g["input_tokens"] += r.input_tokens
+            g["output_tokens"] += r.output_tokens
+            g["cached_tokens"] += r.cache_read_input_tokens
+            g["latency_s"] = round(g["latency_s"] + r.latency_s, 3)
+            g["cost_usd"] = round(g["cost_usd"] + r.cost_usd, 6)
+        return groups
+
+    def by_phase(self) -> dict[str, dict]:
+        return self._group("phase")
+
+    def by_agent(self) -> dict[str, dict]:
+        return self._group("agent")
+
+    @property
+    def total_cost_usd(self) -> float:
+        return round(sum(r.cost_usd for r in self.records), 6)
+
+    def to_dict(self) -> dict:
+        return {
+            "total_cost_usd": self.total_cost_usd,
+            "by_phase": self.by_phase(),
+            "by_agent": self.by_agent(),
+            "calls": [asdict(r) for r in self.records],
+        }
+
+
+_report: contextvars.ContextVar[UsageReport | None] = contextvars.ContextVar("llm_usage_report", default=None)
+_attribution: contextvars.ContextVar[dict[str, str]] = contextvars.ContextVar("llm_usage_attribution", default={})
+_fallback_hops: contextvars.ContextVar[int] = contextvars.ContextVar("llm_fallback_hops", default=0)
+_captures: contextvars.ContextVar[tuple[list[CallRecord], ...]] = contextvars.ContextVar(
+    "llm_usage_captures", default=()
+)
+
+
+@contextmanager
+def usage_scope(
+    report: UsageReport | None = None, **attribution: str
+) -> Iterator[None]:
+    """Attribute LLM calls made inside this block (phase, agent, task_type).
+
+    Passing a report also starts collecting into it; nested scopes inherit
+    the report and any attribution they don't override.
+    """
+    report_token = _report.set(report) if report is not None else None
+    attr_token = _attribution.set({**_attribution.get(), **attribution})
+    try:
+        yield
+    finally:
+        _attribution.reset(attr_token)
+        if report_token is not None:
+            _report.reset(report_token)
+
+
+@contextmanager
+def fallback_hop(hops: int) -> Iterator[None]:
+    """Mark calls inside this block as made `hops` providers down the fallback chain."""
+    token = _fallback_hops.set(hops)
+    try:
+        yield
+    finally:
+        _fallback_hops.reset(token)
+
+
+@contextmanager
+def capture_calls() -> Iterator[list[CallRecord]]:
+    """Also collect the calls made inside this block into the yielded list.
+
+    Calls still reach the active report, so this works inside or outside
+    a `usage_scope`.
+    """
+    records: list[CallRecord] = []
+    token = _captures.set((*_captures.get(), records))
+    try:
+        yield records
+    finally:
+        _captures.reset(token)
+
+
+def record_call(
+    provider: str,
+    model: str,
+    usage: dict[str, int],
+    latency_s: float,
+    retries: int = 0,
+    cache_hit: bool = False,
+):
+    """Add a call to the active report; a no-op outside any `usage_scope`."""
+    report = _report.get()
+    captures = _captures.get()
+    if report is None and not captures:
+        return
+    attribution = _attribution.get()
+    record = CallRecord(
+        provider=provider,
+        model=model,
+        task_type=attribution.get("task_type", "default"),
+        phase=attribution.get("phase", ""),
+        agent=attribution.get("agent", ""),
+        input_tokens=usage.get("input_tokens", 0),
+        output_tokens=usage.get("output_tokens", 0),
+        cache_read_input_tokens=usage.get("cache_read_input_tokens", 0),
+        cache_creation_input_tokens=usage.get("cache_creation_input_tokens", 0),
+        latency_s=round(latency_s, 3),
+        retries=retries,
+        fallback_hops=_fallback_hops.get(),
+        cache_hit=cache_hit,
+        cost_usd=0.0 if cache_hit else estimate_cost_usd(model, usage),
+    )
+    if report is not None:
+        report.records.append(record)
+    for records in captures:
+        records.append(record)
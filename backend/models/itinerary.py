@@ -24,6 +24,64 @@ class DayPlan(BaseModel):
     alt_evening: str | None = None
 
 
+class ItineraryDraft(BaseModel):
+    """The writer LLM's part of an Itinerary; research data is attached separately."""
+    title: str = ""
+    destination: str = ""
+    date_range: str = ""
+    destination_summary: str = ""
+    days: list[DayPlan] = []
+    budget_breakdown: dict[str, float] = {}
+    practical_tips: list[str] = []
+
+
+class DayOutline(BaseModel):
+    """One day of an itinerary skeleton, written out in full by a separate call."""
+    number: int | None = None  # Renumbered by date
+    date: date
+    city: str
+    title: str
+    activities: list[str] = []  # Names from the researched activities
+    notes: str = ""  # Arrival, departure, inter-city travel, day trips
+
+
+class ItinerarySkeleton(BaseModel):
+    title: str = ""
+    date_range: str = ""
+    days: list[DayOutline] = []
+
+
+class ItineraryOverview(BaseModel):
+    """The whole-trip parts of an itinerary, written once every day is planned."""
+    destination_summary: str = ""
+    budget_breakdown: dict[str, float] = {}
+    practical_tips: list[str] = []
+
+
+class DayPatch(BaseModel):
+    """New values for one day's changed fields; fields left null are kept."""
+    number: int
+    title: str | None = None
+    weather: str | None = None
+    morning: str | None = None
+    afternoon: str | None = None
+    evening: str | None = None
+    estimated_cost_usd: float | None = None
+    alt_weather_note: str | None = None
+    alt_morning: str | None = None
+    alt_afternoon: str | None = None
+    alt_evening: str | None = None
+
+
+class ItineraryPatch(BaseModel):
+    """A refinement expressed as changes to the current itinerary."""
+    days: list[DayPatch] = []
+    budget_deltas: dict[str, float] = {}  # Added to budget_breakdown, by category
+    tips_added: list[str] = []
+    tips_removed: list[str] = []  # Exact text of existing tips
+    rewrite: bool = False  # The change can't be expressed as a patch
+
+
 class Itinerary(BaseModel):
     title: str  # "5 Days in Tokyo"
     destination: str
@@ -1,11 +1,16 @@
 import asyncio
 import logging
+import threading
 from pathlib import Path
 
 import typer
 from rich.console import Console
+from rich.table import Table
 
 from backend.agents.orchestrator import Orchestrator
+from backend.agents.refinement import SuggestionsExhaustedError
+from backend.config import settings
+from backend.llm.router import close_providers, warm_up_providers
 from backend.output.terminal import display_itinerary
 from backend.output.markdown import export_markdown
 from backend.output.pdf import export_pdf
@@ -16,12 +21,64 @@ logging.getLogger("asyncio").setLevel(logging.CRITICAL)
 app = typer.Typer(help="Voyager AI - Plan trips with AI-powered research")
 console = Console()
 
+# One long-lived event loop on a background thread. Pooled LLM clients are bound
+# to the loop that first used them, and running it off the main thread lets
+# connection warm-up make progress while the user is typing.
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        threading.Thread(target=_loop.run_forever, daemon=True).start()
+    return _loop
+
+
+def _run(coro):
+    """Run a coroutine on the shared loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def _shutdown():
+    """Close pooled LLM connections and stop the shared loop."""
+    if _loop is None:
+        return
+    try:
+        _run(close_providers())
+    finally:
+        _loop.call_soon_threadsafe(_loop.stop)
+
 
 def _progress_callback(agent: str, status: str):
     """Print agent progress updates to the terminal."""
     console.print(f"  [dim][{agent}][/dim] {status}")
 
 
+def _display_day_preview(day):
+    """Print a finished day while the rest of the itinerary is still being written."""
+    console.print(f"  [dim][Writer][/dim] [bold]Day {day.number}[/bold] ({day.date}) — {day.title}")
+    for slot in ("morning", "afternoon", "evening"):
+        text = getattr(day, slot)
+        console.print(f"     [dim]{slot.title()}:[/dim] {text[:100]}{'…' if len(text) > 100 else ''}")
+
+
+def _display_usage(orchestrator: Orchestrator):
+    """Print LLM token, latency and cost totals per phase and per agent."""
+    usage = orchestrator.usage
+    for title, groups in (("phase", usage.by_phase()), ("agent", usage.by_agent())):
+        table = Table(title=f"LLM usage by {title}", title_justify="left")
+        for col in (title.title(), "Calls", "Input", "Cached", "Output", "Latency (s)", "Cost ($)"):
+            table.add_column(col, justify="left" if col == title.title() else "right")
+        for name, g in groups.items():
+            table.add_row(
+                name or "-", str(g["calls"]), str(g["input_tokens"]), str(g["cached_tokens"]),
+                str(g["output_tokens"]), f"{g['latency_s']:.1f}", f"{g['cost_usd']:.4f}",
+            )
+        console.print(table)
+    console.print(f"[bold]Estimated LLM cost:[/bold] ${usage.total_cost_usd:.4f}")
+
+
 def _run_planning_conversation(orchestrator: Orchestrator, initial_input: str) -> list[dict[str, str]]:
     """Conversational loop to gather trip details before dispatching agents.
 
@@ -31,23 +88,40 @@ def _run_planning_conversation(orchestrator: Orchestrator, initial_input: str) -
     conversation.append({"role": "user", "content": initial_input})
 
     while True:
-        # Ask the LLM to evaluate what we know
-        with console.status("[bold green]Thinking...[/bold green]", spinner="dots"):
-            result = asyncio.run(orchestrator.gather_details(conversation))
+        # Ask the LLM to evaluate what we know, streaming its reply as it's written
+        status = console.status("[bold green]Thinking...[/bold green]", spinner="dots")
+        status.start()
+        streamed = False
+
+        def _on_message(delta: str):
+            nonlocal streamed
+            if not streamed:
+                status.stop()
+                console.print()
+                streamed = True
+            console.out(delta, style="bold cyan", end="")
+
+        try:
+            result = _run(orchestrator.gather_details(conversation, on_message=_on_message))
+        finally:
+            status.stop()
 
         message = result.get("message", "")
         ready = result.get("ready", False)
 
-        if ready:
+        if streamed:
+            console.print()
+        elif ready:
             # Planner has enough info — show confirmation and proceed
             console.print(f"\n[bold green]{message}[/bold green]")
-            conversation.append({"role": "assistant", "content": message})
-            return conversation
-
-        # Show the planner's question(s)
-        console.print(f"\n[bold cyan]{message}[/bold cyan]")
+        else:
+            # Show the planner's question(s)
+            console.print(f"\n[bold cyan]{message}[/bold cyan]")
         conversation.append({"role": "assistant", "content": message})
 
+        if ready:
+            return conversation
+
         # Get user's response
         console.print()
         try:
@@ -129,6 +203,7 @@ def _run_refinement_loop(orchestrator: Orchestrator, itinerary, output_dir: Path
         if pending_suggestions:
             if command == "skip":
                 pending_suggestions = None
+                orchestrator.discard_suggestions()
                 console.print("[dim]Skipped. What else would you like to change?[/dim]")
                 continue
 
@@ -136,10 +211,16 @@ def _run_refinement_loop(orchestrator: Orchestrator, itinerary, output_dir: Path
                 original_request = pending_suggestions.get("_original_request", "")
                 with console.status("[bold green]Finding more alternatives...[/bold green]", spinner="dots"):
                     try:
-                        pending_suggestions = asyncio.run(
-                            orchestrator.suggest_alternatives(itinerary, original_request)
+                        pending_suggestions = _run(
+                            orchestrator.more_alternatives(itinerary, original_request)
                         )
                         pending_suggestions["_original_request"] = original_request
+                    except SuggestionsExhaustedError:
+                        console.print(
+                            "[yellow]No more alternatives for this request. "
+                            "Pick one of the above, or 'skip' to cancel.[/yellow]"
+                        )
+                        continue
                     except Exception as e:
                         console.print(f"[red]Error: {e}[/red]")
                         continue
@@ -153,12 +234,13 @@ def _run_refinement_loop(orchestrator: Orchestrator, itinerary, output_dir: Path
                     chosen = suggestions_list[idx]
                     with console.status("[bold green]Applying your choice...[/bold green]", spinner="dots"):
                         try:
-                            itinerary = asyncio.run(
+                            itinerary = _run(
                                 orchestrator.apply_suggestion(
                                     itinerary,
                                     chosen,
                                     pending_suggestions.get("day_number", 1),
                                     pending_suggestions.get("time_slot", "afternoon"),
+                                    on_day=_display_day_preview,
                                 )
                             )
                         except Exception as e:
@@ -172,22 +254,28 @@ def _run_refinement_loop(orchestrator: Orchestrator, itinerary, output_dir: Path
 
             # Input doesn't match 1/2/3/more/skip — treat as new request
             pending_suggestions = None
+            orchestrator.discard_suggestions()
             # Fall through to normal refinement below
 
         # Classify intent: direct modification or suggestion request
         with console.status("[bold green]Thinking...[/bold green]", spinner="dots"):
             try:
-                mode = asyncio.run(orchestrator.classify_refinement(user_input))
+                mode = _run(orchestrator.classify_refinement(user_input))
             except Exception:
                 mode = "direct"
 
         if mode == "suggest":
             with console.status("[bold green]Finding alternatives...[/bold green]", spinner="dots"):
                 try:
-                    pending_suggestions = asyncio.run(
+                    pending_suggestions = _run(
                         orchestrator.suggest_alternatives(itinerary, user_input)
                     )
                     pending_suggestions["_original_request"] = user_input
+                except SuggestionsExhaustedError:
+                    console.print(
+                        "[yellow]Couldn't find any alternatives. Try describing the change directly.[/yellow]"
+                    )
+                    continue
                 except Exception as e:
                     console.print(f"[red]Error: {e}[/red]")
                     continue
@@ -199,8 +287,10 @@ def _run_refinement_loop(orchestrator: Orchestrator, itinerary, output_dir: Path
             "[bold green]Updating your itinerary...[/bold green]", spinner="dots"
         ):
             try:
-                itinerary = asyncio.run(
-                    orchestrator.refine_itinerary(itinerary, user_input)
+                itinerary = _run(
+                    orchestrator.refine_itinerary(
+                        itinerary, user_input, on_day=_display_day_preview
+                    )
                 )
             except Exception as e:
                 console.print(f"[red]Error updating itinerary: {e}[/red]")
@@ -220,8 +310,34 @@ def plan(
     export: bool = typer.Option(True, "--export/--no-export", help="Export itinerary to Markdown"),
     output_dir: Path = typer.Option(Path("output"), "--output-dir", "-o", help="Output directory"),
     interactive: bool = typer.Option(True, "--interactive/--no-interactive", "-i", help="Enter interactive refinement mode"),
+    cache: bool | None = typer.Option(
+        None, "--cache/--no-cache",
+        help="Reuse cached LLM responses for identical requests (default: LLM_CACHE_ENABLED)",
+    ),
+    usage: bool = typer.Option(False, "--usage", help="Show LLM token, latency and cost report at the end"),
+    cassette: str | None = typer.Option(
+        None, "--cassette",
+        help="Record LLM exchanges to cassettes, or replay them offline (off/record/replay; "
+        "default: LLM_CASSETTE_MODE)",
+    ),
 ):
     """Plan a trip based on your description."""
+    if cassette is not None and cassette not in ("off", "record", "replay"):
+        console.print(f"[red]Unknown --cassette mode: {cassette}[/red]")
+        raise typer.Exit(1)
+    if cache is not None:
+        settings.llm_cache_enabled = cache
+    if cassette is not None:
+        settings.llm_cassette_mode = cassette
+    # Open provider connections in the background while the user types
+    asyncio.run_coroutine_threadsafe(warm_up_providers(), _get_loop())
+    try:
+        _plan(query, export, output_dir, interactive, usage)
+    finally:
+        _shutdown()
+
+
+def _plan(query: str | None, export: bool, output_dir: Path, interactive: bool, usage: bool):
     if not query:
         query = console.input("[bold cyan]Where do you want to travel?[/bold cyan] ")
 
@@ -230,7 +346,17 @@ def plan(
         raise typer.Exit(1)
 
     orchestrator = Orchestrator(on_progress=_progress_callback)
+    try:
+        _run_session(orchestrator, query, export, output_dir, interactive)
+    finally:
+        if usage:
+            console.print()
+            _display_usage(orchestrator)
 
+
+def _run_session(
+    orchestrator: Orchestrator, query: str, export: bool, output_dir: Path, interactive: bool
+):
     # Phase 1: Conversational planning — gather details
     console.print()
     conversation = _run_planning_conversation(orchestrator, query)
@@ -238,7 +364,7 @@ def plan(
     # Phase 2: Dispatch agents and build itinerary
     console.print()
     try:
-        itinerary = asyncio.run(orchestrator.plan_trip(conversation))
+        itinerary = _run(orchestrator.plan_trip(conversation, on_day=_display_day_preview))
     except Exception as e:
         console.print(f"\n[red]Failed to plan trip: {e}[/red]")
         raise typer.Exit(1)
@@ -0,0 +1,17 @@
+from datetime import date
+
+import pytest
+
+from backend.models.itinerary import DayPlan, Itinerary
+
+
+@pytest.fixture
+def itinerary() -> Itinerary:
+    return Itinerary(
+        title="1 Day in Lisbon", destination="Lisbon", date_range="May 1, 2026",
+        destination_summary="",
+        days=[DayPlan(
+            number=1, date=date(2026, 5, 1), title="Alfama", weather="Sunny",
+            morning="Castle", afternoon="Tram 28", evening="Fado",
+        )],
+    )
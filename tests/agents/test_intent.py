@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from backend.agents.intent import IntentClassifier
+
+
+@pytest.mark.parametrize("text, mode", [
+    ("Add a sushi dinner on Day 2", "direct"),
+    ("Please move the temple visit to the morning", "direct"),
+    ("What else could I do on Day 2?", "suggest"),
+])
+def test_patterns(tmp_path, text, mode):
+    prediction = IntentClassifier(tmp_path / "log.jsonl").classify(text)
+    assert (prediction.mode, prediction.source) == (mode, "pattern")
+
+
+@pytest.mark.parametrize("text", [
+    "Make it more fun, any ideas?",
+    "Swap the museum for something outdoorsy",
+])
+def test_open_ended_imperatives_go_to_the_model(tmp_path, text):
+    assert IntentClassifier(tmp_path / "log.jsonl").classify(text).source == "model"
+
+
+def test_log_skips_unreadable_lines_and_keeps_the_latest(tmp_path):
+    log = tmp_path / "log.jsonl"
+    lines = [json.dumps({"text": f"request {i}", "mode": "direct"}) for i in range(5)]
+    lines += ['{"text": "torn', json.dumps({"text": "x", "mode": "maybe"}), "[]", ""]
+    log.write_text("\n".join(lines))
+    classifier = IntentClassifier(log, max_logged=3)
+    assert list(classifier._logged) == [(f"request {i}", "direct") for i in (2, 3, 4)]
+    classifier.record("request 5", "suggest")
+    assert list(classifier._logged)[-1] == ("request 5", "suggest")
+    assert len(classifier._logged) == 3
+
+
+def p_suggest(prediction) -> float:
+    return prediction.confidence if prediction.mode == "suggest" else 1 - prediction.confidence
+
+
+def test_recorded_decisions_update_the_model_without_retraining(tmp_path, monkeypatch):
+    classifier = IntentClassifier(tmp_path / "log.jsonl")
+    text = "The tapas crawl on Day 2 feels touristy"
+    before = classifier.classify(text)
+    monkeypatch.setattr(classifier, "_train", lambda: pytest.fail("retrained"))
+    for _ in range(5):
+        classifier.record(text, "suggest")
+    assert p_suggest(classifier.classify(text)) > p_suggest(before)
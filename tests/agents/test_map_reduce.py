@@ -0,0 +1,59 @@
+import asyncio
+from datetime import date, timedelta
+
+from backend.agents.orchestrator import Orchestrator
+from backend.models.itinerary import DayOutline, DayPlan, ItineraryOverview, ItinerarySkeleton
+from backend.models.trip import TripRequest
+
+DATES = [date(2026, 5, 1) + timedelta(days=i) for i in range(3)]
+REQUEST = TripRequest(
+    origin="Boston", origin_code="BOS", destination="Lisbon", destination_code="LIS",
+    departure_date=DATES[0], return_date=DATES[-1],
+)
+GATHERED = {
+    "activities": [], "weather_forecast": [], "hotel_options": [], "hotels_by_city": [],
+    "flight_options": [],
+}
+
+
+class FakeLLM:
+    def __init__(self, failing_day: int | None = None):
+        self.failing_day = failing_day
+
+    async def complete_structured(self, system_prompt, user_message, model, many=False, max_tokens=4096):
+        if model is ItinerarySkeleton:
+            # Outline days may come back unnumbered; they are renumbered by date
+            return ItinerarySkeleton(days=[
+                DayOutline.model_validate({"date": d, "city": "Lisbon", "title": f"Day at {d}"})
+                for d in DATES
+            ])
+        if model is DayPlan:
+            number = int(user_message.split()[2].rstrip("."))
+            await asyncio.sleep(0.01 * (3 - number))  # Finish out of order
+            if number == self.failing_day:
+                raise ValueError("unusable reply")
+            return DayPlan(
+                number=0, date=DATES[0], title=f"Day {number}", weather="Sunny",
+                morning="Walk", afternoon="Museum", evening="Dinner",
+            )
+        return ItineraryOverview()
+
+
+def write(llm):
+    previews = []
+    draft = asyncio.run(Orchestrator()._write_map_reduce(
+        llm, DATES, REQUEST, GATHERED, [], [], [], lambda day: previews.append(day.number)
+    ))
+    return draft, previews
+
+
+def test_days_previewed_in_order():
+    draft, previews = write(FakeLLM())
+    assert [d.number for d in draft.days] == [1, 2, 3]
+    assert previews == [1, 2, 3]
+
+
+def test_no_previews_when_falling_back():
+    draft, previews = write(FakeLLM(failing_day=1))
+    assert draft is None
+    assert previews == []
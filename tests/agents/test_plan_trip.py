@@ -0,0 +1,27 @@
+import asyncio
+
+from backend.agents.orchestrator import Orchestrator
+from backend.agents.pipeline import Stage, StageGraph
+
+
+def test_prefetch_is_discarded_before_plan_trip_returns(monkeypatch, itinerary):
+    async def write(inputs):
+        return itinerary
+
+    monkeypatch.setattr(
+        Orchestrator, "plan_graph",
+        lambda self, on_day=None: StageGraph(
+            [Stage("itinerary", write, requires=("conversation",))], seeds=("conversation",)
+        ),
+    )
+    orchestrator = Orchestrator()
+
+    async def scenario():
+        orchestrator.prefetch.start("flights", "old request", asyncio.Event().wait)
+        result = await orchestrator.plan_trip([{"role": "user", "content": "Lisbon in May"}])
+        # Checked before anything else runs: cleanup was part of plan_trip, not scheduled later
+        return result, dict(orchestrator.prefetch._jobs)
+
+    result, jobs = asyncio.run(scenario())
+    assert result is itinerary
+    assert jobs == {}
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from backend.agents import orchestrator as orchestrator_module
+from backend.agents.orchestrator import Orchestrator
+from backend.llm.usage import record_call
+from backend.models.itinerary import ItineraryDraft
+
+
+@pytest.fixture
+def rewrites(monkeypatch):
+    """Full rewrites made, with every patch asking for one."""
+    made = []
+
+    async def refine_by_patch(self, *args, **kwargs):
+        return None
+
+    async def write_itinerary(self, llm, system_prompt, user_msg, on_day=None):
+        made.append(user_msg)
+        return ItineraryDraft()
+
+    monkeypatch.setattr(orchestrator_module, "get_provider", lambda task_type: None)
+    monkeypatch.setattr(Orchestrator, "_refine_by_patch", refine_by_patch)
+    monkeypatch.setattr(Orchestrator, "_write_itinerary", write_itinerary)
+    return made
+
+
+def test_rewrites_wait_for_the_users_pick(rewrites, itinerary):
+    orchestrator = Orchestrator()
+    suggestion = {"name": "Surf lesson", "description": "Two hours at Carcavelos"}
+
+    async def scenario():
+        orchestrator.precompute_suggestions(
+            itinerary, {"day_number": 1, "time_slot": "afternoon", "suggestions": [suggestion]}
+        )
+        await asyncio.sleep(0.01)
+        assert rewrites == []  # Not precomputed
+        await orchestrator.apply_suggestion(itinerary, suggestion, 1, "afternoon")
+
+    asyncio.run(scenario())
+    assert len(rewrites) == 1
+
+
+@pytest.fixture
+def refines(monkeypatch):
+    """Refinements started and finished, as (request, speculative); each costs $0.15."""
+    started, finished = [], []
+
+    async def refine(self, current, request, on_day=None, speculative=False):
+        started.append((request, speculative))
+        await asyncio.sleep(0.05)
+        record_call("claude", "claude-sonnet-4-20250514", {"output_tokens": 10_000}, 0.05)
+        finished.append((request, speculative))
+        return current.model_copy(update={"title": request})
+
+    monkeypatch.setattr(Orchestrator, "_refine", refine)
+    return started, finished
+
+
+def page(*names: str) -> dict:
+    return {
+        "day_number": 1, "time_slot": "afternoon",
+        "suggestions": [{"name": n, "description": ""} for n in names],
+    }
+
+
+def picks(refinements) -> list[tuple[str, bool]]:
+    return [(request.split(": ")[1].split(" —")[0], speculative) for request, speculative in refinements]
+
+
+def test_pick_returns_the_precomputed_result(refines, itinerary):
+    started, _ = refines
+    orchestrator = Orchestrator()
+    suggestions = page("Surf lesson", "Tile museum")
+
+    async def scenario():
+        orchestrator.precompute_suggestions(itinerary, suggestions)
+        await asyncio.sleep(0.1)
+        return await orchestrator.apply_suggestion(itinerary, suggestions["suggestions"][0], 1, "afternoon")
+
+    result = asyncio.run(scenario())
+    assert picks(started) == [("Surf lesson", True), ("Tile museum", True)]  # No live refine
+    assert "Surf lesson" in result.title
+    assert orchestrator.prefetch.hits == 1
+
+
+def test_pick_still_queued_is_refined_live_and_the_rest_cancelled(refines, itinerary):
+    started, finished = refines
+    orchestrator = Orchestrator()
+    suggestions = page("Surf lesson", "Tile museum", "Sintra day trip")
+
+    async def scenario():
+        orchestrator.precompute_suggestions(itinerary, suggestions)
+        await asyncio.sleep(0.01)  # The first two hold both slots
+        await orchestrator.apply_suggestion(itinerary, suggestions["suggestions"][2], 1, "afternoon")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert picks(started) == [("Surf lesson", True), ("Tile museum", True), ("Sintra day trip", False)]
+    assert picks(finished) == [("Sintra day trip", False)]
+
+
+def test_running_pick_is_awaited_and_the_rest_cancelled(refines, itinerary):
+    _, finished = refines
+    orchestrator = Orchestrator()
+    suggestions = page("Surf lesson", "Tile museum")
+
+    async def scenario():
+        orchestrator.precompute_suggestions(itinerary, suggestions)
+        await asyncio.sleep(0.01)
+        await orchestrator.apply_suggestion(itinerary, suggestions["suggestions"][1], 1, "afternoon")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert picks(finished) == [("Tile museum", True)]
+
+
+def test_budget_spans_the_pages_of_a_request(refines, itinerary):
+    started, _ = refines
+    orchestrator = Orchestrator()
+
+    async def scenario():
+        orchestrator.precompute_suggestions(itinerary, page("Surf lesson", "Tile museum"))
+        await asyncio.sleep(0.1)  # $0.30 spent
+        orchestrator.discard_precomputed()  # As "more" does
+        orchestrator.precompute_suggestions(itinerary, page("Sintra day trip"))
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert picks(started) == [("Surf lesson", True), ("Tile museum", True)]
@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+
+import pytest
+
+from backend.agents.refinement import PatchError, apply_patch, is_structural, local_refinement
+from backend.models.itinerary import DayPatch, DayPlan, Itinerary, ItineraryPatch
+
+
+def make_itinerary(cost: float | None = None) -> Itinerary:
+    return Itinerary(
+        title="3 Days in Lisbon", destination="Lisbon", date_range="May 1-3, 2026",
+        destination_summary="",
+        days=[
+            DayPlan(
+                number=n, date=date(2026, 5, 1) + timedelta(days=n - 1), title=f"T{n}",
+                weather=f"W{n}", morning=f"M{n}", afternoon=f"A{n}", evening=f"E{n}",
+                estimated_cost_usd=cost, alt_morning=f"altM{n}",
+            )
+            for n in (1, 2, 3)
+        ],
+        budget_breakdown={"food": 300.0, "activities": 100.0},
+        practical_tips=["Buy a Viva Viagem card", "Wear comfortable shoes"],
+    )
+
+
+def slots(itinerary: Itinerary) -> list[tuple[str, str, str]]:
+    return [(d.morning, d.afternoon, d.evening) for d in itinerary.days]
+
+
+@pytest.mark.parametrize("request_, expected", [
+    ("swap day 1 and day 3", [("M3", "A3", "E3"), ("M2", "A2", "E2"), ("M1", "A1", "E1")]),
+    ("Please switch days 2 & 3.", [("M1", "A1", "E1"), ("M3", "A3", "E3"), ("M2", "A2", "E2")]),
+    ("Move the morning to the evening on day 2",
+     [("M1", "A1", "E1"), ("E2", "A2", "M2"), ("M3", "A3", "E3")]),
+    ("move day 1 evening to day 3 morning",
+     [("M1", "A1", "M3"), ("M2", "A2", "E2"), ("E1", "A3", "E3")]),
+    ("Can you drop the afternoon on day 2?",
+     [("M1", "A1", "E1"), ("M2", "Free afternoon — nothing planned.", "E2"), ("M3", "A3", "E3")]),
+    ("cancel day 3 evening plans",
+     [("M1", "A1", "E1"), ("M2", "A2", "E2"), ("M3", "A3", "Free evening — nothing planned.")]),
+])
+def test_structural_requests(request_, expected):
+    assert is_structural(request_)
+    refined, changed = local_refinement(make_itinerary(), request_)
+    assert slots(refined) == expected
+    assert changed
+
+
+@pytest.mark.parametrize("request_", [
+    "Add a sushi dinner on Day 2",
+    "Swap the museum for something outdoorsy",
+    "Make day 2 more relaxed",
+    "drop the boring museum on day 2",
+])
+def test_other_requests_are_not_structural(request_):
+    assert not is_structural(request_)
+    assert local_refinement(make_itinerary(), request_) is None
+
+
+@pytest.mark.parametrize("request_", [
+    "swap day 1 and day 9",  # No such day
+    "swap day 2 and day 2",
+    "drop the afternoon",  # Which day?
+    "move day 1 morning to day 1 morning",
+])
+def test_understood_but_not_applicable(request_):
+    assert is_structural(request_)
+    assert local_refinement(make_itinerary(), request_) is None
+
+
+def test_swapped_days_keep_their_dates_and_weather():
+    refined, _ = local_refinement(make_itinerary(), "swap day 1 and day 2")
+    first = refined.days[0]
+    assert (first.number, first.date, first.weather) == (1, date(2026, 5, 1), "W1")
+    assert (first.title, first.alt_morning) == ("T2", "altM2")
+
+
+def test_drop_clears_the_rain_alternative():
+    refined, _ = local_refinement(make_itinerary(), "drop day 1 morning")
+    assert refined.days[0].alt_morning is None
+
+
+@pytest.mark.parametrize("request_, local", [
+    ("drop day 1 morning", False),
+    ("move day 1 evening to day 3 morning", False),
+    ("move the morning to the evening on day 2", True),
+    ("swap day 1 and day 2", True),  # Costs move with the plans
+])
+def test_costed_days(request_, local):
+    assert (local_refinement(make_itinerary(cost=120.0), request_) is not None) == local
+
+
+@pytest.mark.parametrize("patch, error", [
+    (ItineraryPatch(), "empty"),
+    (ItineraryPatch(days=[DayPatch(number=9, morning="Beach")]), "day 9"),
+    (ItineraryPatch(days=[DayPatch(number=2, evening="  ")]), "evening empty"),
+    (ItineraryPatch(budget_deltas={"activities": -150}), "negative"),
+    (ItineraryPatch(budget_deltas={"Food": 20}), "budget category"),
+    (ItineraryPatch(tips_removed=["Bring an umbrella"]), "tip that doesn't exist"),
+])
+def test_rejected_patches(patch, error):
+    with pytest.raises(PatchError, match=error):
+        apply_patch(make_itinerary(), patch)
+
+
+def test_patch_merges_into_the_itinerary():
+    patch = ItineraryPatch(
+        days=[DayPatch(number=2, afternoon="Surf lesson", estimated_cost_usd=80.0)],
+        budget_deltas={"activities": 60.5},
+        tips_added=["Book surf lessons a day ahead", " "],
+        tips_removed=["wear  comfortable shoes"],
+    )
+    patched, changed = apply_patch(make_itinerary(), patch)
+    assert [d.number for d in changed] == [2]
+    assert slots(patched)[1] == ("M2", "Surf lesson", "E2")
+    assert patched.days[1].estimated_cost_usd == 80.0
+    assert patched.days[1].title == "T2"  # Unpatched fields kept
+    assert patched.days[0] == make_itinerary().days[0]
+    assert patched.budget_breakdown == {"food": 300.0, "activities": 160.5}
+    assert patched.practical_tips == ["Buy a Viva Viagem card", "Book surf lessons a day ahead"]
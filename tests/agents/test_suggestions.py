@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from backend.agents.orchestrator import Orchestrator
+from backend.agents.refinement import SuggestionsExhaustedError
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    """An orchestrator whose LLM comes up with the given batches of alternatives in turn."""
+    batches = []
+
+    async def fill_pool(self, pool, itinerary):
+        await asyncio.sleep(0)
+        pool.add(batches.pop(0) if batches else [])
+
+    monkeypatch.setattr(Orchestrator, "_fill_pool", fill_pool)
+    monkeypatch.setattr(Orchestrator, "precompute_suggestions", lambda *_: None)
+    orchestrator = Orchestrator()
+    orchestrator.batches = batches
+    return orchestrator
+
+
+def names(page):
+    return [s["name"] for s in page["suggestions"]]
+
+
+def test_more_pages_through_the_pool_then_runs_out(orchestrator, itinerary):
+    orchestrator.batches += [[{"name": f"Option {i}"} for i in range(4)], [{"name": "Option 0"}]]
+
+    async def scenario():
+        first = await orchestrator.suggest_alternatives(itinerary, "Something else on day 1?")
+        second = await orchestrator.more_alternatives(itinerary, "Something else on day 1?")
+        with pytest.raises(SuggestionsExhaustedError):
+            await orchestrator.more_alternatives(itinerary, "Something else on day 1?")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert names(first) == ["Option 0", "Option 1", "Option 2"]
+    assert names(second) == ["Option 3"]
+
+
+def test_no_alternatives_at_all(orchestrator, itinerary):
+    with pytest.raises(SuggestionsExhaustedError):
+        asyncio.run(orchestrator.suggest_alternatives(itinerary, "Anything else?"))
+
+
+def test_discard_suggestions_stops_the_refill(orchestrator, itinerary):
+    orchestrator.batches += [[{"name": "Option 0"}], [{"name": "Option 1"}]]
+
+    async def scenario():
+        await orchestrator.suggest_alternatives(itinerary, "Something else on day 1?")
+        refill = orchestrator._pool_refill
+        orchestrator.discard_suggestions()
+        await asyncio.wait([refill])
+        return refill
+
+    assert asyncio.run(scenario()).cancelled()
+    assert orchestrator._suggestion_pool is None
+    assert orchestrator.batches == [[{"name": "Option 1"}]]  # Never asked for
@@ -0,0 +1,28 @@
+import asyncio
+
+from backend.llm.ratelimit import RateLimiter
+
+
+def test_cancelled_waiter_gives_back_its_slot():
+    async def scenario():
+        limiter = RateLimiter(rpm=1, input_tpm=10**6, max_in_flight=2)
+        async with limiter.slot(10):
+            pass  # Uses up the request bucket
+        waiter = asyncio.create_task(limiter.slot(10).__aenter__())
+        await asyncio.sleep(0.05)
+        assert limiter._in_flight._value == 1  # Held while waiting for a refill
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return limiter._in_flight._value
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_slot_released_after_call():
+    async def scenario():
+        limiter = RateLimiter(rpm=60, input_tpm=10**6, max_in_flight=1)
+        async with limiter.slot(10):
+            assert limiter._in_flight._value == 0
+        return limiter._in_flight._value
+
+    assert asyncio.run(scenario()) == 1
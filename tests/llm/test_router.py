@@ -0,0 +1,72 @@
+import asyncio
+
+from backend.llm.base import LLMProvider, LLMResponse
+from backend.llm.health import provider_health
+from backend.llm.latency import within_budget
+from backend.llm.ratelimit import RateLimiter
+from backend.llm.retry import RetryPolicy
+from backend.llm.router import FallbackProvider
+
+
+class FakeProvider(LLMProvider):
+    """Answers after `delay_s`, once it gets a slot from `limiter`."""
+
+    def __init__(self, model: str, limiter: RateLimiter, delay_s: float, deadline_s: float | None = None):
+        self.model = model
+        self.limiter = limiter
+        self.delay_s = delay_s
+        self.retry_policy = RetryPolicy(max_attempts=1, base_delay_s=0, max_delay_s=0, deadline_s=deadline_s)
+
+    async def complete(self, system_prompt, user_message, temperature=0.7, max_tokens=4096):
+        return LLMResponse(content="", model=self.model)
+
+    async def complete_json(self, system_prompt, user_message, response_schema=None, max_tokens=4096):
+        async def attempt():
+            async with self.limiter.slot(10):
+                return await within_budget(asyncio.sleep(self.delay_s, {"model": self.model}))
+
+        return await self.retry_policy.run(attempt)
+
+
+def limiter() -> RateLimiter:
+    return RateLimiter(rpm=1000, input_tpm=10**6, max_in_flight=1)
+
+
+def test_time_queued_behind_the_limiter_is_not_budgeted():
+    shared = limiter()
+    primary = FakeProvider("queued-primary", shared, delay_s=0.01)
+    fallback = FallbackProvider([primary], latency_budget_s=0.05)
+
+    async def scenario():
+        async with shared.slot(10):  # Another request holds the only slot for a while
+            call = asyncio.ensure_future(fallback.complete_json("s", "u"))
+            await asyncio.sleep(0.15)
+        return await call
+
+    assert asyncio.run(scenario()) == {"model": "queued-primary"}
+    assert provider_health(primary.identity).consecutive_failures == 0
+
+
+def test_slow_provider_falls_back_and_is_blamed():
+    primary = FakeProvider("slow-primary", limiter(), delay_s=1.0)
+    secondary = FakeProvider("fast-secondary", limiter(), delay_s=0.01)
+    fallback = FallbackProvider([primary, secondary], latency_budget_s=0.05)
+
+    assert asyncio.run(fallback.complete_json("s", "u")) == {"model": "fast-secondary"}
+    assert provider_health(primary.identity).consecutive_failures == 1
+
+
+def test_deadline_passing_while_queued_is_not_held_against_the_provider():
+    shared = limiter()
+    primary = FakeProvider("starved-primary", shared, delay_s=0.01, deadline_s=0.05)
+    fallback = FallbackProvider([primary], latency_budget_s=1.0)
+
+    async def scenario():
+        async with shared.slot(10):
+            try:
+                await fallback.complete_json("s", "u")
+            except asyncio.TimeoutError:
+                pass
+
+    asyncio.run(scenario())
+    assert provider_health(primary.identity).consecutive_failures == 0